@@ -1,9 +1,12 @@
 """
 Customer Support Email Agent - LangGraph workflow.
 
-Processes incoming emails: classify → search KB → draft response → decide action.
+Processes incoming emails: preprocess → classify → search KB → draft response → decide action.
 """
 
+import logging
+import os
+import time
 from typing import TypedDict
 
 from langchain_core.prompts import ChatPromptTemplate
@@ -11,7 +14,13 @@ from langchain_ollama import ChatOllama
 from langgraph.graph import END, START, StateGraph
 from langgraph.graph.state import CompiledStateGraph
 
-from .knowledge_base import search_knowledge_base
+from .cassette import active_cassette, use_cassette
+from .context_budget import ContextBudget
+from .email_preprocess import clean_email
+from .keyword_rules import load_rules
+from .knowledge_base import NO_RESULTS, search_knowledge_base_passages
+
+logger = logging.getLogger(__name__)
 
 # --- State schema ---
 
@@ -20,6 +29,9 @@ class EmailState(TypedDict):
     """State passed through the email processing graph."""
 
     email_content: str
+    original_email: str
+    chars_saved: int
+    tokens_saved: int
     urgency: str
     topic: str
     kb_context: str
@@ -30,7 +42,52 @@ class EmailState(TypedDict):
 
 # --- LLM setup ---
 
-LLM = ChatOllama(model="gemma3:1b", temperature=0.2)
+
+def _keep_alive(value: str) -> str | int | float:
+    """Pass numeric keep_alive values to Ollama as numbers.
+
+    Ollama parses a string as a Go duration ("30m") and rejects "-1"; a
+    number is seconds, with -1 meaning forever.
+    """
+    for number in (int, float):
+        try:
+            return number(value)
+        except ValueError:
+            pass
+    return value
+
+
+# How long Ollama keeps the model loaded after a request (e.g. "30m", "1h", "-1" = forever)
+KEEP_ALIVE = _keep_alive(os.environ.get("AGENT_KEEP_ALIVE", "30m"))
+
+# Context window and reply cap; prompt budgets below are derived from these
+NUM_CTX = 2048
+NUM_PREDICT = 512
+
+LLM = use_cassette(
+    ChatOllama(
+        model="gemma3:1b",
+        temperature=0.2,
+        num_ctx=NUM_CTX,
+        num_predict=NUM_PREDICT,
+        keep_alive=KEEP_ALIVE,
+    )
+)
+
+# --- Keyword rules (classification fallbacks, decision overrides) ---
+
+RULES = load_rules()
+
+# --- Context budgets (prompt tokens per node, at most NUM_CTX - NUM_PREDICT) ---
+
+BUDGETS = {
+    "classify": ContextBudget("classify", 1024),
+    "draft_response": ContextBudget("draft_response", NUM_CTX - NUM_PREDICT),
+    "decide_action": ContextBudget("decide_action", NUM_CTX - NUM_PREDICT),
+}
+# Tokens held back for KB passages / the draft when the email is fitted first
+KB_RESERVE_TOKENS = 512
+DRAFT_RESERVE_TOKENS = 384
 
 # --- Classification prompt ---
 
@@ -53,10 +110,11 @@ DRAFT_PROMPT = ChatPromptTemplate.from_messages([
         "system",
         "You are a professional customer support agent. Draft a helpful, empathetic email response. "
         "Use the provided knowledge base context when relevant. Be concise. Do not invent information.\n\n"
-        "Knowledge base:\n{kb_context}\n\n"
         "If the KB does not fully address the issue, acknowledge it and suggest next steps.",
     ),
-    ("human", "Customer email:\n{email}\n\nDraft a response."),
+    # Variable context goes in the human turn so the system prefix stays byte-identical
+    # across calls and Ollama can reuse its KV cache.
+    ("human", "Knowledge base:\n{kb_context}\n\nCustomer email:\n{email}\n\nDraft a response."),
 ])
 
 # --- Decision prompt ---
@@ -80,13 +138,48 @@ DECIDE_PROMPT = ChatPromptTemplate.from_messages([
 ])
 
 
+def initial_state(email_content: str) -> EmailState:
+    """Build the input state for one email."""
+    return {
+        "email_content": email_content,
+        "original_email": "",
+        "chars_saved": 0,
+        "tokens_saved": 0,
+        "urgency": "",
+        "topic": "",
+        "kb_context": "",
+        "response_draft": "",
+        "escalate": False,
+        "follow_up": "",
+    }
+
+
 # --- Graph nodes ---
 
 
+def preprocess_email(state: EmailState) -> dict:
+    """Strip HTML, quoted history and signatures; keep the original for output."""
+    original = state["email_content"]
+    cleaned = clean_email(original)
+    counter = BUDGETS["classify"].counter
+    tokens_saved = counter.count(original) - counter.count(cleaned)
+    if cleaned != original:
+        logger.info(
+            "preprocess: removed %d chars (~%d tokens per prompt)", len(original) - len(cleaned), tokens_saved
+        )
+    return {
+        "email_content": cleaned,
+        "original_email": original,
+        "chars_saved": len(original) - len(cleaned),
+        "tokens_saved": tokens_saved,
+    }
+
+
 def classify_email(state: EmailState) -> dict:
     """Classify email by urgency and topic."""
     chain = CLASSIFY_PROMPT | LLM
-    result = chain.invoke({"email": state["email_content"]})
+    email = BUDGETS["classify"].fit_text(CLASSIFY_PROMPT, "email", state["email_content"])
+    result = chain.invoke({"email": email})
     text = result.content.strip()
     parts = text.split("|")
     urgency = parts[0].strip() if len(parts) > 0 else "Medium"
@@ -99,32 +192,30 @@ def classify_email(state: EmailState) -> dict:
     if topic not in valid_topics:
         topic = "Technical Issue"
 
-    # Keyword fallback for common misclassifications (small models)
-    email_lower = state["email_content"].lower()
-    if "password" in email_lower or "reset" in email_lower or "login" in email_lower:
-        if "api" not in email_lower and "504" not in email_lower:
-            topic = "Account"
-    if "charged" in email_lower or "double charge" in email_lower or "billing" in email_lower:
-        topic = "Billing"
-    if "crash" in email_lower or "bug" in email_lower or ("export" in email_lower and "pdf" in email_lower):
-        topic = "Bug"
-    if "dark mode" in email_lower or "feature" in email_lower and "add" in email_lower:
-        topic = "Feature Request"
-
-    return {"urgency": urgency, "topic": topic}
+    # Keyword fallback for common misclassifications (small models), see rules.json
+    return RULES["classify"].apply(state["email_content"], {"urgency": urgency, "topic": topic})
 
 
 def search_kb(state: EmailState) -> dict:
-    """Search knowledge base for relevant content."""
-    context = search_knowledge_base(state["email_content"], state["topic"])
-    return {"kb_context": context}
+    """Search knowledge base; keep the best passages that fit the draft budget."""
+    budget = BUDGETS["draft_response"]
+    passages = search_knowledge_base_passages(state["email_content"], state["topic"])
+    # Size passages against the email as draft_response will send it
+    email = budget.fit_text(
+        DRAFT_PROMPT, "email", state["email_content"], reserve=KB_RESERVE_TOKENS, log=False, kb_context=""
+    )
+    passages = budget.fit_passages(DRAFT_PROMPT, "kb_context", passages, email=email)
+    return {"kb_context": "\n\n".join(passages) if passages else NO_RESULTS}
 
 
 def draft_response(state: EmailState) -> dict:
     """Draft customer response using KB context."""
     chain = DRAFT_PROMPT | LLM
+    email = BUDGETS["draft_response"].fit_text(
+        DRAFT_PROMPT, "email", state["email_content"], kb_context=state["kb_context"]
+    )
     result = chain.invoke({
-        "email": state["email_content"],
+        "email": email,
         "kb_context": state["kb_context"],
     })
     return {"response_draft": result.content.strip()}
@@ -133,28 +224,55 @@ def draft_response(state: EmailState) -> dict:
 def decide_action(state: EmailState) -> dict:
     """Decide: auto-reply vs escalate, and any follow-up."""
     chain = DECIDE_PROMPT | LLM
-    result = chain.invoke({
-        "email": state["email_content"],
-        "topic": state["topic"],
-        "urgency": state["urgency"],
-        "draft": state["response_draft"],
-    })
+    budget = BUDGETS["decide_action"]
+    labels = {"topic": state["topic"], "urgency": state["urgency"]}
+    email = budget.fit_text(
+        DECIDE_PROMPT, "email", state["email_content"], reserve=DRAFT_RESERVE_TOKENS, draft="", **labels
+    )
+    draft = budget.fit_text(DECIDE_PROMPT, "draft", state["response_draft"], email=email, **labels)
+    result = chain.invoke({"email": email, "draft": draft, **labels})
     text = result.content.strip().upper()
     escalate = "ESCALATE" in text
     lines = result.content.strip().split("\n")
     follow_up = lines[-1].strip() if len(lines) > 1 and "none" not in lines[-1].lower() else "None"
 
-    # Rule-based overrides for robustness
-    if state["urgency"] == "High" and state["topic"] in ("Billing", "Technical Issue"):
-        escalate = True
-    if "504" in state["email_content"] or "intermittent" in state["email_content"].lower():
-        escalate = True
-        follow_up = "Engineering to investigate API errors within 48h"
-    # Simple Account questions (password reset, etc.) → auto-reply
-    if state["topic"] == "Account" and state["urgency"] != "High":
-        escalate = False
+    # Rule-based overrides for robustness, see rules.json
+    decision = RULES["decide"].apply(
+        state["email_content"],
+        {"urgency": state["urgency"], "topic": state["topic"], "escalate": escalate, "follow_up": follow_up},
+    )
+    follow_up = decision["follow_up"]
+
+    return {"escalate": decision["escalate"], "follow_up": follow_up if follow_up != "None" else ""}
+
 
-    return {"escalate": escalate, "follow_up": follow_up if follow_up != "None" else ""}
+# --- Warmup ---
+
+NODE_PROMPTS = {
+    "classify": CLASSIFY_PROMPT,
+    "draft_response": DRAFT_PROMPT,
+    "decide_action": DECIDE_PROMPT,
+}
+
+
+def warm_up() -> None:
+    """Load the model and prime Ollama's prompt cache with each node's static prefix.
+
+    Call once at process start so the first email does not pay the model
+    load; the model then stays resident for KEEP_ALIVE. Ollama keeps one
+    cached prompt per parallel slot, so set OLLAMA_NUM_PARALLEL to 3 or more
+    for all three node prefixes to stay cached. Skipped while replaying a
+    cassette, which has no model to warm and no recordings of these calls.
+    """
+    cassette = active_cassette()
+    if cassette is not None and not cassette.recording:
+        logger.info("warm_up: skipped, replaying from %s", cassette.path)
+        return
+    llm = LLM.model_copy(update={"num_predict": 1})
+    for node, prompt in NODE_PROMPTS.items():
+        messages = prompt.format_messages(**dict.fromkeys(prompt.input_variables, ""))
+        llm.invoke(messages)
+        logger.info("warm_up: primed %s prefix", node)
 
 
 # --- Build graph ---
@@ -164,12 +282,14 @@ def build_graph() -> CompiledStateGraph:
     """Build and compile the customer support email graph."""
     builder = StateGraph(EmailState)
 
+    builder.add_node("preprocess", preprocess_email)
     builder.add_node("classify", classify_email)
     builder.add_node("search_kb", search_kb)
     builder.add_node("draft_response", draft_response)
     builder.add_node("decide_action", decide_action)
 
-    builder.add_edge(START, "classify")
+    builder.add_edge(START, "preprocess")
+    builder.add_edge("preprocess", "classify")
     builder.add_edge("classify", "search_kb")
     builder.add_edge("search_kb", "draft_response")
     builder.add_edge("draft_response", "decide_action")
@@ -188,3 +308,18 @@ def get_agent() -> CompiledStateGraph:
     if _graph is None:
         _graph = build_graph()
     return _graph
+
+
+def invoke_timed(state: EmailState, config: dict | None = None) -> tuple[EmailState, dict[str, float]]:
+    """Run the agent on one email; return the final state and seconds per node (plus "total")."""
+    result = dict(state)
+    timings: dict[str, float] = {}
+    start = last = time.perf_counter()
+    for update in get_agent().stream(state, config=config, stream_mode="updates"):
+        now = time.perf_counter()
+        for node, values in update.items():
+            timings[node] = round(now - last, 4)
+            result.update(values or {})
+        last = now
+    timings["total"] = round(last - start, 4)
+    return result, timings
@@ -0,0 +1,259 @@
+"""
+Record/replay cassettes for Ollama calls.
+
+In record mode every chat request sent to Ollama through a wrapped
+ChatOllama is stored, with its streamed response chunks and timings, in a
+JSONL cassette (gzip-compressed when the path ends in ``.gz``). Recording
+replaces the cassette when the run finishes; ``append`` mode adds to it
+instead. In replay mode the same requests are answered from the cassette
+without a model, either instantly or, in ``replay-timed`` mode, with the
+recorded latency.
+
+Enable with environment variables (read at import):
+  LLM_CASSETTE=runs/examples.jsonl.gz LLM_CASSETTE_MODE=record python run_examples.py
+  LLM_CASSETTE=runs/examples.jsonl.gz LLM_CASSETTE_MODE=replay python run_examples.py
+
+or call configure() before the first request. Set LLM_CASSETTE_STRICT=0 to let
+replay serve a request's recordings again once they are used up.
+"""
+
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterator
+
+MODES = ("record", "append", "replay", "replay-timed")
+
+# Request fields that determine the response; stream/keep_alive do not.
+_KEY_FIELDS = ("model", "messages", "tools", "format", "options", "think")
+
+
+class CassetteMiss(KeyError):
+    """A replayed request has no recording in the cassette."""
+
+
+def _to_dict(obj: Any) -> dict:
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(exclude_none=True)
+    return dict(obj)
+
+
+def _from_dict(data: dict) -> Any:
+    try:
+        from ollama import ChatResponse
+    except ImportError:
+        return data
+    return ChatResponse.model_validate(data)
+
+
+def request_key(request: dict) -> str:
+    """Stable hash of the request fields that affect the response."""
+    payload = {name: request.get(name) for name in _KEY_FIELDS}
+    encoded = json.dumps(payload, sort_keys=True, default=lambda o: _to_dict(o) if hasattr(o, "model_dump") else str(o))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:24]
+
+
+def _open(path: Path, mode: str):
+    if path.suffix == ".gz":
+        return gzip.open(path, mode, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class Cassette:
+    """Recorded Ollama interactions, keyed by request.
+
+    Identical requests (e.g. repeated sampling) are recorded as separate
+    interactions and replayed in recorded order. Replaying a request more
+    often than it was recorded raises CassetteMiss, unless ``strict`` is
+    off, in which case its recordings are served again from the start.
+
+    ``record`` writes to a temporary file that replaces the cassette on
+    close(), so an interrupted run leaves the old cassette intact.
+    """
+
+    def __init__(self, path: str | Path, mode: str = "replay", strict: bool = True):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}; expected one of {MODES}")
+        self.path = Path(path)
+        self.mode = mode
+        self.strict = strict
+        self._lock = threading.Lock()
+        self._interactions: dict[str, list[dict]] = {}
+        self._cursor: dict[str, int] = {}
+        self._file = None
+        if mode == "record":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = _open(self._tmp_path, "wt")
+        elif mode == "append":
+            if self.path.exists():
+                self._load()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = _open(self.path, "at")
+        else:
+            self._load()
+
+    @property
+    def recording(self) -> bool:
+        return self.mode in ("record", "append")
+
+    @property
+    def _tmp_path(self) -> Path:
+        # Keep the suffix so the temporary file is compressed like the cassette
+        return self.path.with_name(f"{self.path.stem}.tmp{self.path.suffix}")
+
+    def _load(self) -> None:
+        with _open(self.path, "rt") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._interactions.setdefault(entry["key"], []).append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._interactions.values())
+
+    def add(self, entry: dict) -> None:
+        """Store an interaction and write it to the cassette file."""
+        with self._lock:
+            if self._file is None:
+                raise RuntimeError(f"Cassette {self.path} is not open for recording")
+            self._interactions.setdefault(entry["key"], []).append(entry)
+            self._file.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str) + "\n")
+
+    def next(self, key: str) -> dict:
+        """Return the next recorded interaction for ``key``."""
+        with self._lock:
+            entries = self._interactions.get(key)
+            if not entries:
+                raise CassetteMiss(f"No recording for request {key} in {self.path}")
+            index = self._cursor.get(key, 0)
+            if index >= len(entries) and self.strict:
+                raise CassetteMiss(
+                    f"Request {key} replayed {index + 1} times but recorded {len(entries)} in {self.path}"
+                )
+            self._cursor[key] = index + 1
+            return entries[index % len(entries)]
+
+    def close(self) -> None:
+        """Finish writing; in record mode this replaces the cassette file."""
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.close()
+            self._file = None
+            if self.mode == "record":
+                os.replace(self._tmp_path, self.path)
+
+
+class _CassetteClient:
+    """Stands in for ollama.Client; routes chat() through the active cassette."""
+
+    def __init__(self, client: Any):
+        self._client = client
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+    def chat(self, **request: Any) -> Any:
+        cassette = _active
+        if cassette is None:
+            return self._client.chat(**request)
+        key = request_key(request)
+        stream = request.get("stream", False)
+        if cassette.recording:
+            if stream:
+                return self._record_stream(cassette, key, request)
+            start = time.perf_counter()
+            response = self._client.chat(**request)
+            elapsed = time.perf_counter() - start
+            cassette.add(_entry(key, request, [_to_dict(response)], elapsed, elapsed))
+            return response
+
+        entry = cassette.next(key)
+        chunks = self._replay(entry, timed=cassette.mode == "replay-timed")
+        return chunks if stream else list(chunks)[-1]
+
+    def _record_stream(self, cassette: Cassette, key: str, request: dict) -> Iterator[Any]:
+        start = time.perf_counter()
+        first_chunk_s = None
+        chunks = []
+        for chunk in self._client.chat(**request):
+            if first_chunk_s is None:
+                first_chunk_s = time.perf_counter() - start
+            chunks.append(_to_dict(chunk))
+            yield chunk
+        cassette.add(_entry(key, request, chunks, first_chunk_s or 0.0, time.perf_counter() - start))
+
+    @staticmethod
+    def _replay(entry: dict, timed: bool) -> Iterator[Any]:
+        chunks = entry["chunks"]
+        gap = 0.0
+        if timed and len(chunks) > 1:
+            gap = max(0.0, entry["elapsed_s"] - entry["first_chunk_s"]) / (len(chunks) - 1)
+        for i, chunk in enumerate(chunks):
+            if timed:
+                time.sleep(entry["first_chunk_s"] if i == 0 else gap)
+            yield _from_dict(chunk)
+
+
+def _entry(key: str, request: dict, chunks: list[dict], first_chunk_s: float, elapsed_s: float) -> dict:
+    return {
+        "key": key,
+        "model": request.get("model"),
+        "messages": request.get("messages"),
+        "format": request.get("format"),
+        "chunks": chunks,
+        "first_chunk_s": round(first_chunk_s, 4),
+        "elapsed_s": round(elapsed_s, 4),
+        "recorded_at": time.time(),
+    }
+
+
+_active: Cassette | None = None
+
+
+def configure(path: str | Path | None, mode: str = "replay", strict: bool = True) -> Cassette | None:
+    """Activate a cassette for all wrapped models, or deactivate with ``path=None``.
+
+    The previously active cassette is closed. The active one is closed at
+    interpreter exit.
+    """
+    global _active
+    if _active is not None:
+        _active.close()
+    _active = Cassette(path, mode, strict) if path else None
+    return _active
+
+
+def active_cassette() -> Cassette | None:
+    """The cassette wrapped models currently use, or None."""
+    return _active
+
+
+@atexit.register
+def _close_active() -> None:
+    if _active is not None:
+        _active.close()
+
+
+def use_cassette(llm: Any) -> Any:
+    """Route a ChatOllama's requests through the active cassette (if any).
+
+    Returns ``llm`` itself, so it can wrap the constructor call. With no
+    cassette configured, requests go straight to Ollama.
+    """
+    if not isinstance(llm._client, _CassetteClient):
+        llm._client = _CassetteClient(llm._client)
+    return llm
+
+
+if os.environ.get("LLM_CASSETTE"):
+    configure(
+        os.environ["LLM_CASSETTE"],
+        os.environ.get("LLM_CASSETTE_MODE", "replay"),
+        strict=os.environ.get("LLM_CASSETTE_STRICT", "1") != "0",
+    )
@@ -0,0 +1,172 @@
+"""
+Token budgets for prompt context.
+
+Counts tokens for the target Ollama model (including the prompt template
+around the variables) and trims variable context to fit a per-node budget:
+ranked passages are dropped lowest-rank first, free text is cut at the end.
+"""
+
+import logging
+import math
+import os
+from functools import lru_cache
+
+from langchain_core.prompts import ChatPromptTemplate
+
+logger = logging.getLogger(__name__)
+
+# Hugging Face tokenizers matching Ollama model families. Only used with
+# CONTEXT_BUDGET_TOKENIZER=hf (needs `transformers` and Hub access; loaded on
+# first count, not at import). Otherwise counts are a characters-per-token
+# estimate.
+USE_HF_TOKENIZER = os.environ.get("CONTEXT_BUDGET_TOKENIZER", "").lower() == "hf"
+TOKENIZER_IDS = {
+    "gemma3": "google/gemma-3-1b-it",
+}
+
+# Average characters per token for English text, by model family.
+CHARS_PER_TOKEN = {
+    "gemma3": 3.6,
+}
+DEFAULT_CHARS_PER_TOKEN = 4.0
+
+# Chat template markers added around each message (turn start/end, role).
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@lru_cache(maxsize=None)
+def _load_tokenizer(model: str):
+    family = model.split(":", 1)[0]
+    tokenizer_id = TOKENIZER_IDS.get(family)
+    if tokenizer_id is None:
+        return None
+    try:
+        from transformers import AutoTokenizer
+    except ImportError:
+        return None
+    try:
+        return AutoTokenizer.from_pretrained(tokenizer_id)
+    except Exception as e:  # gated or offline: estimate instead
+        logger.debug("Tokenizer %s unavailable (%s); estimating token counts", tokenizer_id, e)
+        return None
+
+
+class TokenCounter:
+    """Count tokens as the target model would, or estimate them from length."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.chars_per_token = CHARS_PER_TOKEN.get(model.split(":", 1)[0], DEFAULT_CHARS_PER_TOKEN)
+
+    @property
+    def _tokenizer(self):
+        return _load_tokenizer(self.model) if USE_HF_TOKENIZER else None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        tokenizer = self._tokenizer
+        if tokenizer is not None:
+            return len(tokenizer.encode(text, add_special_tokens=False))
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Return the longest prefix of ``text`` that fits in ``max_tokens``."""
+        if max_tokens <= 0:
+            return ""
+        if self.count(text) <= max_tokens:
+            return text
+        tokenizer = self._tokenizer
+        if tokenizer is not None:
+            return tokenizer.decode(tokenizer.encode(text, add_special_tokens=False)[:max_tokens])
+        return text[: int(max_tokens * self.chars_per_token)]
+
+
+class ContextBudget:
+    """A per-node prompt token budget for one model.
+
+    ``max_tokens`` covers the whole formatted prompt: template text, fixed
+    variables and the context being fitted. Set it to the model's ``num_ctx``
+    minus its ``num_predict``, so the prompt and the reply both fit and
+    Ollama never truncates the prompt itself (which drops the system prompt
+    first).
+    """
+
+    def __init__(self, name: str, max_tokens: int, model: str = "gemma3:1b"):
+        self.name = name
+        self.max_tokens = max_tokens
+        self.counter = TokenCounter(model)
+
+    def prompt_tokens(self, prompt: ChatPromptTemplate, **variables) -> int:
+        """Tokens in the formatted prompt, including per-message overhead."""
+        messages = prompt.format_messages(**variables)
+        return sum(self.counter.count(m.content) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+    def fit_passages(
+        self,
+        prompt: ChatPromptTemplate,
+        field: str,
+        passages: list[str],
+        separator: str = "\n\n",
+        **variables,
+    ) -> list[str]:
+        """Keep the highest-ranked passages that fit in ``field``.
+
+        ``passages`` must be ordered best first. Passages are dropped from the
+        end; if not even the first one fits, it is truncated.
+        """
+        available = self.max_tokens - self.prompt_tokens(prompt, **{field: ""}, **variables)
+        separator_tokens = self.counter.count(separator)
+        kept: list[str] = []
+        used = 0
+        truncated = False
+        for passage in passages:
+            cost = self.counter.count(passage) + (separator_tokens if kept else 0)
+            if used + cost > available:
+                if not kept and available > 0:
+                    kept.append(self.counter.truncate(passage, available))
+                    truncated = True
+                break
+            kept.append(passage)
+            used += cost
+
+        if truncated or len(kept) < len(passages):
+            total = sum(self.counter.count(p) for p in passages)
+            logger.info(
+                "%s: %s trimmed to %d of %d tokens (%d of %d passages dropped)",
+                self.name,
+                field,
+                sum(self.counter.count(p) for p in kept),
+                total,
+                len(passages) - len(kept),
+                len(passages),
+            )
+        return kept
+
+    def fit_text(
+        self,
+        prompt: ChatPromptTemplate,
+        field: str,
+        text: str,
+        reserve: int = 0,
+        log: bool = True,
+        **variables,
+    ) -> str:
+        """Cut ``text`` at the end so the prompt fits, holding back ``reserve`` tokens.
+
+        Use ``reserve`` to leave room for a variable that is fitted afterwards
+        (e.g. KB passages placed in the same prompt). Pass ``log=False`` when
+        only sizing other context against the text, to avoid reporting a cut
+        twice.
+        """
+        available = self.max_tokens - reserve - self.prompt_tokens(prompt, **{field: ""}, **variables)
+        fitted = self.counter.truncate(text, available)
+        if log and len(fitted) < len(text):
+            logger.info(
+                "%s: %s trimmed to %d of %d tokens",
+                self.name,
+                field,
+                self.counter.count(fitted),
+                self.counter.count(text),
+            )
+        return fitted
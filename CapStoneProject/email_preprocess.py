@@ -0,0 +1,172 @@
+"""
+Email preprocessing: reduce a raw support email to the customer's new message.
+
+Converts HTML to text and strips quoted reply history, signature blocks and
+legal disclaimers, so the LLM prompts only carry text that matters.
+"""
+
+import re
+from html.parser import HTMLParser
+
+_HTML_TAG = re.compile(r"<(?:html|body|div|p|br|span|table|td|tr|font|a|b|i)\b[^>]*>", re.IGNORECASE)
+
+# Lines that start the quoted history of a reply or forward; everything from
+# here down is dropped.
+_REPLY_HEADER = re.compile(
+    r"^(?:"
+    r"On\b.{0,200}\bwrote:\s*$"
+    r"|-{2,}\s*Original Message\s*-{2,}"
+    r"|From:\s.+\n(?:.*\n){0,2}(?:Sent|Date):\s"
+    r")",
+    re.IGNORECASE | re.MULTILINE,
+)
+# "On <date>, <name> <addr>" is often wrapped before "wrote:"
+_WRAPPED_ON_WROTE = re.compile(r"^On\b.{0,200}\n.{0,200}\bwrote:\s*$", re.IGNORECASE | re.MULTILINE)
+
+_SIGNATURE = re.compile(r"^(?:Sent from my [\w ]{1,30}$|Get Outlook for \w+\s*$)", re.IGNORECASE | re.MULTILINE)
+# A "-- " signature delimiter or an underscore rule. Customers also use these
+# lines as dividers, so only a lone one that sets off a short block is cut.
+_SEPARATOR = re.compile(r"^(?:--|_{10,})\s*$", re.MULTILINE)
+# Full legal boilerplate only; a customer writing "Notice: ..." or
+# "Disclaimer: ..." is not matched. Only cut when it starts near the end.
+_DISCLAIMER = re.compile(
+    r"^(?:(?:CONFIDENTIALITY NOTICE|DISCLAIMER|NOTICE)\s*:?\s*)?"
+    r"(?:This (?:e-?mail|message|communication)(?: and any (?:files|attachments))?\s(?:transmitted with it\s)?"
+    r"|The information (?:contained )?in this (?:e-?mail|message)\s)"
+    r"(?:is|are|may be|contains?)\s(?:strictly\s)?(?:confidential|intended|privileged)",
+    re.IGNORECASE | re.MULTILINE,
+)
+_DISCLAIMER_TAIL_LINES = 15
+# A closing line followed only by a short block (name, title, phone...).
+_SIGN_OFF = re.compile(
+    r"^(?:thanks|thank you|many thanks|regards|best regards|kind regards|warm regards|"
+    r"best wishes|cheers|sincerely)[,.!]?\s*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+_SIGN_OFF_MAX_TRAILING_LINES = 6
+# Lines after a sign-off that are message text, not a signature block
+_POSTSCRIPT = re.compile(r"^P\.?(?:P\.?)?S\b", re.IGNORECASE)
+_SENTENCE_END = re.compile(r"[.!?…]$")
+
+_QUOTED_LINE = re.compile(r"^[ \t]*>.*\n?", re.MULTILINE)
+_TRAILING_SPACE = re.compile(r"[ \t]+$", re.MULTILINE)
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+class _HTMLToText(HTMLParser):
+    _BLOCK_TAGS = {"br", "p", "div", "tr", "li", "h1", "h2", "h3", "h4", "blockquote", "table"}
+    _SKIP_TAGS = {"script", "style", "head", "title"}
+
+    def __init__(self):
+        super().__init__()
+        self.parts: list[str] = []
+        self._skip = 0
+        self._quote = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP_TAGS:
+            self._skip += 1
+        elif tag == "blockquote":
+            self._quote += 1
+        if tag in self._BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif tag == "blockquote":
+            self._quote = max(0, self._quote - 1)
+        if tag in self._BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        # Quoted replies in HTML mail are <blockquote>s; drop them here.
+        if not self._skip and not self._quote:
+            self.parts.append(data)
+
+    def get_text(self) -> str:
+        return "".join(self.parts)
+
+
+def html_to_text(text: str) -> str:
+    """Convert an HTML email body to plain text; plain text is returned unchanged."""
+    if not _HTML_TAG.search(text):
+        return text
+    parser = _HTMLToText()
+    parser.feed(text)
+    parser.close()
+    return parser.get_text()
+
+
+def _cut_at(pattern: re.Pattern, text: str) -> str:
+    match = pattern.search(text)
+    return text[: match.start()] if match else text
+
+
+def _cut_disclaimer(text: str) -> str:
+    """Drop legal boilerplate that starts within the last lines of ``text``."""
+    tail_start = 0
+    lines = text.rstrip().split("\n")
+    if len(lines) > _DISCLAIMER_TAIL_LINES:
+        tail_start = len("\n".join(lines[:-_DISCLAIMER_TAIL_LINES])) + 1
+    match = _DISCLAIMER.search(text, tail_start)
+    return text[: match.start()] if match else text
+
+
+def _is_message_text(line: str) -> bool:
+    """Whether a line after a sign-off reads as message text rather than a signature."""
+    words = line.split()
+    return bool(
+        _POSTSCRIPT.match(line)
+        or len(words) >= 8
+        or (len(words) >= 3 and _SENTENCE_END.search(line))
+    )
+
+
+def _is_signature_block(text: str) -> bool:
+    """Whether ``text`` is a short block (name, title, phone...) without message text."""
+    text = text.strip()
+    if text.count("\n") >= _SIGN_OFF_MAX_TRAILING_LINES:
+        return False
+    return not any(_is_message_text(line.strip()) for line in text.splitlines())
+
+
+def _cut_sign_off(text: str) -> str:
+    """Cut at the first sign-off followed only by a short signature block."""
+    for match in _SIGN_OFF.finditer(text):
+        if _is_signature_block(text[match.end():]):
+            return text[: match.start()]
+    return text
+
+
+def _cut_separator(text: str) -> str:
+    """Cut at the first lone separator line followed only by a short signature block."""
+    matches = list(_SEPARATOR.finditer(text))
+    kinds = [match.group()[0] for match in matches]
+    for match, kind in zip(matches, kinds):
+        # The same separator repeated marks out sections of the message
+        if kinds.count(kind) == 1 and _is_signature_block(text[match.end():]):
+            return text[: match.start()]
+    return text
+
+
+def clean_email(text: str) -> str:
+    """Return the new message in ``text`` without HTML, quoted history or signatures.
+
+    Disclaimers are only removed near the end of the message, and a sign-off
+    or separator line is kept when message text (e.g. a P.S.) follows it. Falls back to the
+    stripped original if cleaning would leave nothing (e.g. a forward with
+    no new text).
+    """
+    cleaned = html_to_text(text.replace("\r\n", "\n"))
+    cleaned = _cut_at(_WRAPPED_ON_WROTE, cleaned)
+    cleaned = _cut_at(_REPLY_HEADER, cleaned)
+    cleaned = _QUOTED_LINE.sub("", cleaned)
+    cleaned = _cut_disclaimer(cleaned)
+    cleaned = _cut_at(_SIGNATURE, cleaned)
+    cleaned = _cut_separator(cleaned)
+    cleaned = _cut_sign_off(cleaned)
+
+    cleaned = _TRAILING_SPACE.sub("", cleaned)
+    cleaned = _BLANK_LINES.sub("\n\n", cleaned).strip()
+    return cleaned or text.strip()
@@ -0,0 +1,286 @@
+"""
+On-disk knowledge base store.
+
+Articles are Markdown/text files (one article per file, section taken from
+front matter or the parent directory name) or JSON files (one article object,
+or a list of them, each with "text" and optional "section"/"id"). They are
+indexed into a SQLite database (WAL mode) in the index directory:
+
+  files     source file -> mtime, size, sha1
+  articles  article id, section and text, indexed by section
+  postings  term -> article, keyed by term (and indexed by article)
+
+A query reads only the index pages for its terms and section, and SQLite's
+page cache is bounded, so memory stays flat as the KB grows. refresh()
+reindexes only files whose mtime/size (then sha1) changed; replacing a
+file's articles deletes and inserts just their rows, so an edit costs
+O(article), not O(index). watch() runs refresh() in a background thread for
+hot reload; readers keep serving the last committed index meanwhile.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+ARTICLE_SUFFIXES = {".md", ".markdown", ".txt", ".json"}
+INDEX_FILE = "kb.db"
+COMMIT_EVERY = 500  # files per transaction while reindexing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha1 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    file TEXT NOT NULL,
+    article_id TEXT NOT NULL,
+    section TEXT NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_articles_file ON articles(file);
+CREATE INDEX IF NOT EXISTS idx_articles_section ON articles(section, article_id);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    article INTEGER NOT NULL,
+    PRIMARY KEY (term, article)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_postings_article ON postings(article);
+"""
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can do for from has have how i if in is it my no not of on or our "
+    "the this to was we when with you your".split()
+)
+_FRONT_MATTER = re.compile(r"\A---\s*\n(.*?)\n---\s*\n", re.DOTALL)
+
+
+def tokenize(text: str) -> set[str]:
+    """Distinct index terms in ``text``."""
+    return {t for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS}
+
+
+def parse_articles(rel_path: str, data: bytes) -> list[dict]:
+    """Parse one source file into article records (id, section, text)."""
+    path = Path(rel_path)
+    default_section = path.parent.name if path.parent.name else "general"
+    text = data.decode("utf-8", errors="replace")
+
+    if path.suffix.lower() == ".json":
+        records = json.loads(text)
+        if isinstance(records, dict):
+            records = records.get("articles", [records])
+        return [
+            {
+                "id": str(record.get("id", f"{rel_path}#{i}")),
+                "section": record.get("section", default_section),
+                "text": record["text"].strip(),
+            }
+            for i, record in enumerate(records)
+        ]
+
+    section = default_section
+    match = _FRONT_MATTER.match(text)
+    if match:
+        for line in match.group(1).splitlines():
+            key, _, value = line.partition(":")
+            if key.strip().lower() == "section" and value.strip():
+                section = value.strip()
+        text = text[match.end():]
+    return [{"id": rel_path, "section": section, "text": text.strip()}]
+
+
+class KBStore:
+    """On-disk article store built from a directory of source files."""
+
+    def __init__(self, source_dir: str | Path, index_dir: str | Path):
+        self.source_dir = Path(source_dir)
+        self.index_dir = Path(index_dir)
+        self.path = self.index_dir / INDEX_FILE
+        self._lock = threading.Lock()
+        self._watcher: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def _connect(self) -> sqlite3.Connection:
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    # --- Reading ---
+
+    def sections(self) -> list[str]:
+        """Names of the sections that have articles."""
+        conn = self._reader()
+        try:
+            rows = conn.execute("SELECT DISTINCT section FROM articles ORDER BY section")
+            return [section for (section,) in rows]
+        finally:
+            conn.close()
+
+    def has_section(self, section: str) -> bool:
+        """Whether ``section`` has any articles (an indexed lookup)."""
+        conn = self._reader()
+        try:
+            return conn.execute("SELECT 1 FROM articles WHERE section = ? LIMIT 1", (section,)).fetchone() is not None
+        finally:
+            conn.close()
+
+    def search(self, query: str, section: str, k: int = 3) -> list[str]:
+        """Return up to ``k`` article texts for ``query``, best first.
+
+        Articles in ``section`` come first (most query terms matched first,
+        then the rest of the section), followed by matching articles from
+        other sections.
+        """
+        terms = sorted(tokenize(query))
+        placeholders = ",".join("?" * len(terms))
+        matching = f"""
+            SELECT a.id, a.text FROM postings p JOIN articles a ON a.id = p.article
+            WHERE p.term IN ({placeholders}) AND a.section {{op}} ?
+            GROUP BY a.id ORDER BY COUNT(*) DESC, a.article_id LIMIT ?
+        """
+        conn = self._reader()
+        try:
+            results: list[tuple[int, str]] = []
+            if terms:
+                results += conn.execute(matching.format(op="="), [*terms, section, k]).fetchall()
+            # Fill from the rest of the section before other sections' matches
+            if len(results) < k:
+                seen = [row_id for row_id, _ in results]
+                results += conn.execute(
+                    f"SELECT id, text FROM articles WHERE section = ? AND id NOT IN ({','.join('?' * len(seen))}) "
+                    "ORDER BY article_id LIMIT ?",
+                    [section, *seen, k - len(results)],
+                ).fetchall()
+            if terms and len(results) < k:
+                results += conn.execute(matching.format(op="!="), [*terms, section, k - len(results)]).fetchall()
+            return [text for _, text in results]
+        finally:
+            conn.close()
+
+    # --- Indexing ---
+
+    def _scan(self) -> dict[str, os.stat_result]:
+        files = {}
+        for root, dirs, names in os.walk(self.source_dir):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for name in names:
+                path = Path(root) / name
+                if not name.startswith(".") and path.suffix.lower() in ARTICLE_SUFFIXES:
+                    files[path.relative_to(self.source_dir).as_posix()] = path.stat()
+        return files
+
+    def refresh(self) -> dict:
+        """Incrementally reindex changed source files; returns change counts."""
+        with self._lock:
+            conn = self._connect()
+            try:
+                return self._refresh(conn)
+            finally:
+                conn.close()
+
+    def _refresh(self, conn: sqlite3.Connection) -> dict:
+        known = {path: (mtime_ns, size, sha1) for path, mtime_ns, size, sha1 in conn.execute("SELECT * FROM files")}
+        current = self._scan()
+        stats = {"files": len(current), "added": 0, "removed": 0}
+
+        # Commit in batches of files; a file's rows always change within one
+        # transaction, so readers never see it half-replaced.
+        pending = 0
+        try:
+            for rel_path in set(known) - set(current):
+                stats["removed"] += self._remove_file(conn, rel_path)
+                conn.execute("DELETE FROM files WHERE path = ?", (rel_path,))
+                pending += 1
+
+            for rel_path, st in current.items():
+                entry = known.get(rel_path)
+                if entry and entry[:2] == (st.st_mtime_ns, st.st_size):
+                    continue
+                data = (self.source_dir / rel_path).read_bytes()
+                sha1 = hashlib.sha1(data).hexdigest()
+                conn.execute(
+                    "INSERT OR REPLACE INTO files (path, mtime_ns, size, sha1) VALUES (?, ?, ?, ?)",
+                    (rel_path, st.st_mtime_ns, st.st_size, sha1),
+                )
+                if not (entry and entry[2] == sha1):
+                    stats["removed"] += self._remove_file(conn, rel_path)
+                    stats["added"] += self._add_file(conn, rel_path, data)
+                pending += 1
+                if pending >= COMMIT_EVERY:
+                    conn.commit()
+                    pending = 0
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+        if stats["added"] or stats["removed"]:
+            logger.info("kb: reindexed %(added)d articles, removed %(removed)d (%(files)d files)", stats)
+        return stats
+
+    @staticmethod
+    def _add_file(conn: sqlite3.Connection, rel_path: str, data: bytes) -> int:
+        """Insert a source file's articles and their postings; returns how many."""
+        try:
+            articles = parse_articles(rel_path, data)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.warning("kb: skipping %s: %s", rel_path, e)
+            return 0
+        for article in articles:
+            cursor = conn.execute(
+                "INSERT INTO articles (file, article_id, section, text) VALUES (?, ?, ?, ?)",
+                (rel_path, article["id"], article["section"], article["text"]),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO postings (term, article) VALUES (?, ?)",
+                ((term, cursor.lastrowid) for term in tokenize(article["text"])),
+            )
+        return len(articles)
+
+    @staticmethod
+    def _remove_file(conn: sqlite3.Connection, rel_path: str) -> int:
+        """Delete a source file's articles and their postings; returns how many."""
+        ids = [(row_id,) for (row_id,) in conn.execute("SELECT id FROM articles WHERE file = ?", (rel_path,))]
+        conn.executemany("DELETE FROM postings WHERE article = ?", ids)
+        conn.executemany("DELETE FROM articles WHERE id = ?", ids)
+        return len(ids)
+
+    # --- Hot reload ---
+
+    def watch(self, interval: float = 10.0) -> None:
+        """Refresh in a background thread every ``interval`` seconds."""
+        if self._watcher is not None:
+            return
+
+        def run() -> None:
+            while not self._stop.wait(interval):
+                try:
+                    self.refresh()
+                except Exception:
+                    logger.exception("kb: background refresh failed")
+
+        self._watcher = threading.Thread(target=run, name="kb-watch", daemon=True)
+        self._watcher.start()
+
+    def stop(self) -> None:
+        self._stop.set()
@@ -0,0 +1,223 @@
+"""
+Declarative keyword rules, compiled into a single-pass matcher.
+
+Rules live in a JSON file with one list of rules per stage:
+
+  {"classify": [rule, ...], "decide": [rule, ...]}
+
+Each rule may have:
+  "any":       list of clauses; the rule fires if any clause matches. A clause
+               is a list of terms that must all appear; a term is a keyword or
+               a list of alternative keywords.
+  "unless":    keywords that block the rule.
+  "state":     {field: [values]} the current state must match.
+  "state_not": {field: [values]} the current state must not match.
+  "set":       {field: value} applied when the rule fires.
+
+Rules are applied in order, so later rules override earlier ones. Keywords
+are whole words or phrases, case-insensitive. A "*" at the end allows any
+word ending ("crash*" matches "crashes"), at the start any word beginning
+("*charged" matches "overcharged").
+
+All keywords of a stage are compiled into one token index, so each email is
+tokenized once and scanned once regardless of how many rules there are.
+"""
+
+import json
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+RULES_PATH = Path(os.environ.get("AGENT_RULES", Path(__file__).parent / "rules.json"))
+
+_TOKEN = re.compile(r"[a-z0-9]+|\x00")
+_RULE_FIELDS = {"name", "any", "unless", "state", "state_not", "set"}
+
+EXACT, PREFIX, SUFFIX, CONTAINS = "exact", "prefix", "suffix", "contains"
+
+
+def _compile_keyword(keyword: str) -> tuple[tuple[str, str], ...]:
+    """Turn a keyword into (token, mode) pairs."""
+    tokens = _TOKEN.findall(keyword.lower())
+    if not tokens:
+        raise ValueError(f"Keyword {keyword!r} has no letters or digits")
+    starts_wild = keyword.strip().startswith("*")
+    ends_wild = keyword.strip().endswith("*")
+    pattern = []
+    for i, token in enumerate(tokens):
+        first_wild = starts_wild and i == 0
+        last_wild = ends_wild and i == len(tokens) - 1
+        if first_wild and last_wild:
+            mode = CONTAINS
+        elif first_wild:
+            mode = SUFFIX
+        elif last_wild:
+            mode = PREFIX
+        else:
+            mode = EXACT
+        pattern.append((token, mode))
+    return tuple(pattern)
+
+
+def _token_matches(token: str, expected: str, mode: str) -> bool:
+    if mode == EXACT:
+        return token == expected
+    if mode == PREFIX:
+        return token.startswith(expected)
+    if mode == SUFFIX:
+        return token.endswith(expected)
+    return expected in token
+
+
+class KeywordMatcher:
+    """Find which of a fixed set of keywords occur in a text, in one pass.
+
+    Keywords are indexed by their first token: exact tokens in a dict,
+    prefix/suffix tokens in dicts keyed by length, so the per-token cost
+    depends on the number of distinct wildcard lengths, not on the number
+    of keywords. Only "*word*" (contains) keywords are checked one by one.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = sorted(set(keywords))
+        self._exact: dict[str, list] = {}
+        self._prefix: dict[int, dict[str, list]] = {}
+        self._suffix: dict[int, dict[str, list]] = {}
+        self._contains: list = []
+        for keyword in self.keywords:
+            pattern = _compile_keyword(keyword)
+            (first, mode), rest = pattern[0], pattern[1:]
+            entry = (keyword, rest)
+            if mode == EXACT:
+                self._exact.setdefault(first, []).append(entry)
+            elif mode == PREFIX:
+                self._prefix.setdefault(len(first), {}).setdefault(first, []).append(entry)
+            elif mode == SUFFIX:
+                self._suffix.setdefault(len(first), {}).setdefault(first, []).append(entry)
+            else:
+                self._contains.append((first, entry))
+
+    def _scan(self, tokens: list[str], start: int, end: int) -> set[str]:
+        found: set[str] = set()
+        for i in range(start, end):
+            token = tokens[i]
+            candidates = list(self._exact.get(token, ()))
+            for length, index in self._prefix.items():
+                if len(token) >= length:
+                    candidates.extend(index.get(token[:length], ()))
+            for length, index in self._suffix.items():
+                if len(token) >= length:
+                    candidates.extend(index.get(token[-length:], ()))
+            for first, entry in self._contains:
+                if first in token:
+                    candidates.append(entry)
+            for keyword, rest in candidates:
+                if keyword in found or i + len(rest) >= end:
+                    continue
+                if all(_token_matches(tokens[i + 1 + j], t, m) for j, (t, m) in enumerate(rest)):
+                    found.add(keyword)
+        return found
+
+    def match(self, text: str) -> set[str]:
+        """Keywords present in ``text``."""
+        tokens = _TOKEN.findall(text.lower())
+        return self._scan(tokens, 0, len(tokens))
+
+    def match_batch(self, texts: list[str]) -> list[set[str]]:
+        """Keywords present in each text; all texts are tokenized in one regex pass."""
+        if not texts:
+            return []
+        # NUL separates the texts, so it must not occur inside one
+        tokens = _TOKEN.findall("\x00".join(text.replace("\x00", " ") for text in texts).lower())
+        results = []
+        start = 0
+        for end in [i for i, token in enumerate(tokens) if token == "\x00"] + [len(tokens)]:
+            results.append(self._scan(tokens, start, end))
+            start = end + 1
+        assert len(results) == len(texts), "match_batch: result count does not match input count"
+        return results
+
+
+@dataclass(frozen=True)
+class Rule:
+    """One declarative rule; see the module docstring for the fields."""
+
+    name: str
+    clauses: tuple
+    unless: tuple
+    state: dict
+    state_not: dict
+    updates: dict
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Rule":
+        unknown = set(data) - _RULE_FIELDS
+        if unknown:
+            raise ValueError(f"Rule {data.get('name', '?')!r}: unknown fields {sorted(unknown)}")
+        if not data.get("set"):
+            raise ValueError(f"Rule {data.get('name', '?')!r} has nothing to set")
+        clauses = tuple(
+            tuple(tuple([term] if isinstance(term, str) else term) for term in clause)
+            for clause in data.get("any", [])
+        )
+        return cls(
+            name=data.get("name", ""),
+            clauses=clauses,
+            unless=tuple(data.get("unless", [])),
+            state=data.get("state", {}),
+            state_not=data.get("state_not", {}),
+            updates=data["set"],
+        )
+
+    def keywords(self) -> set[str]:
+        words = set(self.unless)
+        for clause in self.clauses:
+            for alternatives in clause:
+                words.update(alternatives)
+        return words
+
+    def fires(self, found: set[str], state: dict) -> bool:
+        if any(state.get(field) not in values for field, values in self.state.items()):
+            return False
+        if any(state.get(field) in values for field, values in self.state_not.items()):
+            return False
+        if self.unless and not found.isdisjoint(self.unless):
+            return False
+        if not self.clauses:
+            return True
+        return any(
+            all(not found.isdisjoint(alternatives) for alternatives in clause)
+            for clause in self.clauses
+        )
+
+
+class RuleSet:
+    """An ordered list of rules sharing one compiled keyword matcher."""
+
+    def __init__(self, rules: list[Rule]):
+        self.rules = rules
+        self.matcher = KeywordMatcher(word for rule in rules for word in rule.keywords())
+
+    def _apply(self, found: set[str], state: dict) -> dict:
+        result = dict(state)
+        for rule in self.rules:
+            if rule.fires(found, result):
+                result.update(rule.updates)
+        return result
+
+    def apply(self, text: str, state: dict) -> dict:
+        """Return ``state`` updated by every rule that fires for ``text``."""
+        return self._apply(self.matcher.match(text), state)
+
+    def apply_batch(self, texts: list[str], states: list[dict]) -> list[dict]:
+        """apply() over a batch, scanning all texts in one tokenizer pass."""
+        return [self._apply(found, state) for found, state in zip(self.matcher.match_batch(texts), states)]
+
+
+def load_rules(path: str | Path = RULES_PATH) -> dict[str, RuleSet]:
+    """Load and compile the rule file: stage name -> RuleSet."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {stage: RuleSet([Rule.from_dict(rule) for rule in rules]) for stage, rules in data.items()}
@@ -1,56 +1,58 @@
-"""Simple in-memory knowledge base for customer support FAQs."""
-
-KNOWLEDGE_BASE = {
-    "account": [
-        "To reset your password: 1) Go to Settings > Account, 2) Click 'Forgot Password', "
-        "3) Enter your email to receive a reset link. Link expires in 1 hour.",
-        "Account recovery: Use the 'Forgot Username' link on the login page. "
-        "You will need to verify your email address.",
-    ],
-    "billing": [
-        "For duplicate charges: Contact support with your transaction ID. "
-        "Refunds are processed within 5-7 business days.",
-        "Subscription management: Go to Settings > Billing to cancel or change your plan. "
-        "Changes take effect at the next billing cycle.",
-    ],
-    "bug": [
-        "Known issue - PDF export: We are aware of crashes when selecting PDF format. "
-        "Workaround: Try exporting as CSV first, then convert. Fix planned for next release.",
-        "Bug reports: Please include: steps to reproduce, your app version, and device/browser. "
-        "Submit via our support portal for tracking.",
-    ],
-    "feature_request": [
-        "We log all feature requests. Dark mode, mobile improvements, and API enhancements "
-        "are on our roadmap. Vote for features in our community forum.",
-        "Feature request process: Submit via the Feedback form. Our product team reviews "
-        "requests quarterly.",
-    ],
-    "technical_issue": [
-        "API 504 errors: Usually indicate timeout or temporary server overload. "
-        "Implement retry with exponential backoff. Check status page for outages.",
-        "API integration: Ensure you use the latest API version. Rate limit: 100 req/min. "
-        "Documentation: docs.example.com/api",
-    ],
-}
+"""
+Knowledge base for customer support FAQs.
+
+Articles live as Markdown/JSON files under ``kb/`` (one directory per
+section) and are served from an on-disk index (see kb_store). Set
+KB_DIR / KB_INDEX_DIR to use another corpus, and KB_RELOAD_INTERVAL
+(seconds, 0 to disable) to control how often file changes are picked up.
+"""
+
+import os
+import threading
+from pathlib import Path
+
+from .kb_store import KBStore
+
+KB_DIR = Path(os.environ.get("KB_DIR", Path(__file__).parent / "kb"))
+KB_INDEX_DIR = Path(os.environ.get("KB_INDEX_DIR", KB_DIR.parent / ".kb_index"))
+KB_RELOAD_INTERVAL = float(os.environ.get("KB_RELOAD_INTERVAL", "10"))
+
+NO_RESULTS = "No specific documentation found. Suggest escalation for complex queries."
+
+_store: KBStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> KBStore:
+    """Get the knowledge base store, bringing its index up to date on first use.
+
+    The first call runs an incremental refresh (a stat of every source file,
+    reindexing only changed ones), so edits made while no process was running
+    are picked up even with KB_RELOAD_INTERVAL=0 or in short CLI runs.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            store = KBStore(KB_DIR, KB_INDEX_DIR)
+            store.refresh()
+            if KB_RELOAD_INTERVAL > 0:
+                store.watch(KB_RELOAD_INTERVAL)
+            _store = store
+    return _store
+
+
+def search_knowledge_base_passages(query: str, topic: str, k: int = 3) -> list[str]:
+    """Return up to ``k`` relevant passages, most relevant (topic section) first."""
+    store = get_store()
+    topic_key = topic.lower().replace(" ", "_").replace("featurerequest", "feature_request")
+
+    # Map topic to KB sections
+    if not store.has_section(topic_key):
+        topic_key = "technical_issue"
+    return store.search(query, topic_key, k)
 
 
 def search_knowledge_base(query: str, topic: str, k: int = 3) -> str:
     """Search the knowledge base for relevant content."""
-    results = []
-    query_lower = query.lower()
-    topic_lower = topic.lower().replace(" ", "_").replace("featurerequest", "feature_request")
-
-    # Map topic to KB keys
-    topic_key = topic_lower if topic_lower in KNOWLEDGE_BASE else "technical_issue"
-    if topic_key in KNOWLEDGE_BASE:
-        results.extend(KNOWLEDGE_BASE[topic_key])
-
-    # Also search by query keywords across all sections
-    for section, docs in KNOWLEDGE_BASE.items():
-        if section != topic_key:
-            for doc in docs:
-                if any(word in doc.lower() for word in query_lower.split()):
-                    if doc not in results:
-                        results.append(doc)
-
-    return "\n\n".join(results[:k]) if results else "No specific documentation found. Suggest escalation for complex queries."
+    results = search_knowledge_base_passages(query, topic, k)
+    return "\n\n".join(results) if results else NO_RESULTS
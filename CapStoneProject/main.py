@@ -11,6 +11,7 @@ Usage:
 
 import argparse
 import json
+import logging
 import sys
 
 
@@ -22,6 +23,7 @@ def format_output(result: dict) -> str:
         "=" * 50,
         f"Classified Urgency: {result.get('urgency', 'N/A')}",
         f"Identified Topic:   {result.get('topic', 'N/A')}",
+        f"Preprocessing:      removed {result.get('chars_saved', 0)} chars (~{result.get('tokens_saved', 0)} tokens)",
         "-" * 50,
         "Response Draft:",
         result.get("response_draft", "N/A"),
@@ -48,10 +50,35 @@ def main() -> None:
         action="store_true",
         help="Output raw JSON instead of formatted text",
     )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Log processing details (e.g. context trimmed to fit token budgets)",
+    )
+    parser.add_argument(
+        "--warmup",
+        action="store_true",
+        help="Load the model and prime prompt prefixes before processing",
+    )
+    parser.add_argument(
+        "--measure-prefill",
+        action="store_true",
+        help="Report prompt tokens vs. prefill tokens Ollama actually evaluated, per node",
+    )
+    parser.add_argument(
+        "--store",
+        metavar="DB",
+        help="Also save the result, timings and model to a SQLite results store (see results_store.py)",
+    )
     args = parser.parse_args()
 
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO, format="%(name)s: %(message)s")
+
     try:
-        from src.agent import get_agent
+        from src.agent import LLM, initial_state, invoke_timed, warm_up
+        from src.prefill_meter import PrefillMeter
+        from src.results_store import ResultsStore
     except ImportError as e:
         print(
             "Error: Install dependencies first:\n"
@@ -76,25 +103,25 @@ def main() -> None:
         print("Error: Empty email content.", file=sys.stderr)
         sys.exit(1)
 
-    # Build initial state
-    initial_state = {
-        "email_content": email_content,
-        "urgency": "",
-        "topic": "",
-        "kb_context": "",
-        "response_draft": "",
-        "escalate": False,
-        "follow_up": "",
-    }
+    if args.warmup:
+        warm_up()
+
+    meter = PrefillMeter() if args.measure_prefill else None
+    config = {"callbacks": [meter]} if meter else None
+    result, timings = invoke_timed(initial_state(email_content), config=config)
 
-    agent = get_agent()
-    result = agent.invoke(initial_state)
+    if args.store:
+        with ResultsStore(args.store) as store:
+            store.add(result, timings, LLM.model)
 
     if args.json:
         print(json.dumps(dict(result), indent=2))
     else:
         print(format_output(result))
 
+    if meter:
+        print(meter.report(), file=sys.stderr)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,99 @@
+"""
+Prefill measurement for Ollama calls made inside the graph.
+
+PrefillMeter is a LangChain callback handler that records, per graph node,
+how many prompt tokens each call sent (estimated) and how many Ollama
+actually evaluated (``prompt_eval_count``, which excludes tokens served from
+the KV cache of a matching prompt prefix). The first call per node is
+reported separately from later ones, showing the effect of a warm cache.
+"""
+
+import threading
+from dataclasses import dataclass, field
+from typing import Any
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
+
+from .context_budget import MESSAGE_OVERHEAD_TOKENS, TokenCounter
+
+
+@dataclass
+class NodePrefill:
+    calls: int = 0
+    prompt_tokens: int = 0
+    evaluated: list[int] = field(default_factory=list)
+    prefill_ms: float = 0.0
+
+
+class PrefillMeter(BaseCallbackHandler):
+    """Collect prompt vs. evaluated prefill tokens per graph node."""
+
+    def __init__(self, model: str = "gemma3:1b"):
+        self.counter = TokenCounter(model)
+        self.nodes: dict[str, NodePrefill] = {}
+        self._pending: dict[UUID, tuple[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(
+        self,
+        serialized: dict[str, Any],
+        messages: list[list[BaseMessage]],
+        *,
+        run_id: UUID,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        node = (metadata or {}).get("langgraph_node", "(outside graph)")
+        tokens = sum(
+            self.counter.count(m.content if isinstance(m.content, str) else str(m.content)) + MESSAGE_OVERHEAD_TOKENS
+            for m in messages[0]
+        )
+        with self._lock:
+            self._pending[run_id] = (node, tokens)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            node, tokens = self._pending.pop(run_id, ("(unknown)", 0))
+            generation = response.generations[0][0] if response.generations and response.generations[0] else None
+            message = getattr(generation, "message", None)
+            info = dict(getattr(message, "response_metadata", None) or {})
+            info.update((generation.generation_info or {}) if generation else {})
+
+            stats = self.nodes.setdefault(node, NodePrefill())
+            stats.calls += 1
+            stats.prompt_tokens += tokens
+            if info.get("prompt_eval_count") is not None:
+                stats.evaluated.append(info["prompt_eval_count"])
+            stats.prefill_ms += (info.get("prompt_eval_duration") or 0) / 1e6
+
+    def report(self) -> str:
+        """Per-node table: prompt tokens sent vs. prefill tokens evaluated."""
+        lines = [
+            "=" * 78,
+            "PREFILL PER NODE (prompt tokens are estimates; evaluated is from Ollama)",
+            "=" * 78,
+            f"{'Node':<16}{'Calls':>6}{'Prompt/call':>13}{'Eval first':>12}{'Eval after':>12}"
+            f"{'Reused':>9}{'Prefill ms':>12}",
+        ]
+        for node, stats in self.nodes.items():
+            prompt_per_call = stats.prompt_tokens / stats.calls if stats.calls else 0
+            first = stats.evaluated[0] if stats.evaluated else None
+            later = stats.evaluated[1:]
+            after = sum(later) / len(later) if later else None
+            evaluated_mean = sum(stats.evaluated) / len(stats.evaluated) if stats.evaluated else None
+            reused = (
+                f"{max(0.0, 1 - evaluated_mean / prompt_per_call):.0%}"
+                if evaluated_mean is not None and prompt_per_call
+                else "N/A"
+            )
+            lines.append(
+                f"{node:<16}{stats.calls:>6}{prompt_per_call:>13.0f}"
+                f"{first if first is not None else 'N/A':>12}"
+                f"{f'{after:.0f}' if after is not None else 'N/A':>12}"
+                f"{reused:>9}{stats.prefill_ms:>12.0f}"
+            )
+        lines.append("=" * 78)
+        return "\n".join(lines)
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Indexed results store for processed emails (SQLite, WAL mode).
+
+Workers hand finished EmailStates to ResultsStore.add(), which only queues
+them; a single writer thread commits them in batched transactions, so
+processing never waits on disk. Rows are indexed by topic, urgency,
+escalation and time for the query CLI.
+
+Usage:
+  python src/results_store.py results.db --topic Billing --urgency High --escalate yes --since 24h --count
+  python src/results_store.py results.db --since 2026-10-18 --until 2026-10-19 --limit 20
+  python src/results_store.py results.db --escalate no --json
+"""
+
+import argparse
+import json
+import logging
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    processed_at REAL NOT NULL,
+    topic TEXT,
+    urgency TEXT,
+    escalate INTEGER,
+    follow_up TEXT,
+    model TEXT,
+    total_seconds REAL,
+    timings TEXT,
+    state TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_processed_at ON results(processed_at);
+CREATE INDEX IF NOT EXISTS idx_results_topic ON results(topic, urgency, escalate, processed_at);
+CREATE INDEX IF NOT EXISTS idx_results_urgency ON results(urgency, escalate, processed_at);
+CREATE INDEX IF NOT EXISTS idx_results_escalate ON results(escalate, processed_at);
+"""
+
+_INSERT = """
+INSERT INTO results (processed_at, topic, urgency, escalate, follow_up, model, total_seconds, timings, state)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_STOP = object()
+# Errors a bad row can raise: SQLite errors, or values that cannot be bound
+# (e.g. an integer too large for SQLite)
+_ROW_ERRORS = (sqlite3.Error, OverflowError, ValueError, TypeError)
+
+
+def _connect(path: str | Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class ResultsStore:
+    """Queue results and write them from a background thread in batches.
+
+    A batch is committed once ``batch_size`` rows are queued or
+    ``flush_interval`` seconds have passed, whichever comes first. If a
+    batch fails, its rows are retried one by one and only the bad rows are
+    dropped (and logged, counted in ``failed_rows``). If the writer thread
+    itself fails, add(), flush() and close() raise RuntimeError.
+    """
+
+    def __init__(self, path: str | Path, batch_size: int = 500, flush_interval: float = 0.5):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue()
+        self._error: BaseException | None = None
+        self._closed = False
+        self._stop_seen = False
+        self.failed_rows = 0
+        _connect(self.path).close()  # create schema up front so errors surface here
+        self._writer = threading.Thread(target=self._run, name="results-writer", daemon=True)
+        self._writer.start()
+
+    def add(self, state: dict, timings: dict | None = None, model: str = "", processed_at: float | None = None) -> None:
+        """Queue a final EmailState (plus per-node timings and model) for writing."""
+        self._check()
+        if self._closed:
+            raise RuntimeError(f"Results store {self.path} is closed")
+        timings = timings or {}
+        self._queue.put((
+            processed_at or time.time(),
+            state.get("topic"),
+            state.get("urgency"),
+            int(bool(state.get("escalate"))),
+            state.get("follow_up"),
+            model,
+            timings.get("total"),
+            json.dumps(timings),
+            json.dumps(dict(state), ensure_ascii=False),
+        ))
+
+    def _check(self) -> None:
+        if self._error is not None:
+            raise RuntimeError(f"Results writer for {self.path} failed: {self._error!r}") from self._error
+
+    def _run(self) -> None:
+        try:
+            conn = _connect(self.path)
+            try:
+                self._write_batches(conn)
+            finally:
+                conn.close()
+        except BaseException as e:
+            logger.exception("results store: writer for %s failed", self.path)
+            self._error = e
+            # Keep acknowledging items so flush()/close() never block on a dead
+            # writer, unless it already took the stop marker
+            if not self._stop_seen:
+                while self._queue.get() is not _STOP:
+                    self._queue.task_done()
+                self._queue.task_done()
+
+    def _write_batches(self, conn: sqlite3.Connection) -> None:
+        while True:
+            batch = []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            try:
+                while item is not _STOP:
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    try:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                if batch:
+                    self._write(conn, batch)
+            finally:
+                self._stop_seen = item is _STOP
+                for _ in range(len(batch) + self._stop_seen):
+                    self._queue.task_done()
+            if item is _STOP:
+                return
+
+    def _write(self, conn: sqlite3.Connection, batch: list[tuple]) -> None:
+        try:
+            with conn:
+                conn.executemany(_INSERT, batch)
+            return
+        except _ROW_ERRORS as e:
+            logger.warning("results store: batch of %d rows failed (%s); retrying row by row", len(batch), e)
+        for row in batch:
+            try:
+                with conn:
+                    conn.execute(_INSERT, row)
+            except _ROW_ERRORS as e:
+                self.failed_rows += 1
+                logger.error("results store: dropped result (topic=%r, urgency=%r): %s", row[1], row[2], e)
+
+    def flush(self) -> None:
+        """Block until everything queued so far is committed (or dropped as bad)."""
+        self._queue.join()
+        self._check()
+
+    def close(self) -> None:
+        """Commit remaining rows and stop the writer thread."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_STOP)
+            self._writer.join()
+            if self.failed_rows:
+                logger.warning("results store: %d results could not be stored in %s", self.failed_rows, self.path)
+        self._check()
+
+    def __enter__(self) -> "ResultsStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# --- Queries ---
+
+
+def parse_time(value: str) -> float:
+    """Parse an ISO date/datetime or a relative age like '30m', '24h', '7d' into Unix time."""
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smhd])", value.strip())
+    if match:
+        seconds = float(match.group(1)) * {"s": 1, "m": 60, "h": 3600, "d": 86400}[match.group(2)]
+        return time.time() - seconds
+    return datetime.fromisoformat(value).timestamp()
+
+
+def query(
+    path: str | Path,
+    topic: str | None = None,
+    urgency: str | None = None,
+    escalate: bool | None = None,
+    since: float | None = None,
+    until: float | None = None,
+    limit: int | None = 100,
+    count: bool = False,
+) -> list[dict] | int:
+    """Filter stored results (newest first), or count them with ``count=True``."""
+    clauses, params = [], []
+    for column, value in (("topic", topic), ("urgency", urgency)):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if escalate is not None:
+        clauses.append("escalate = ?")
+        params.append(int(escalate))
+    if since is not None:
+        clauses.append("processed_at >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("processed_at < ?")
+        params.append(until)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    conn = sqlite3.connect(f"file:{Path(path)}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    try:
+        if count:
+            return conn.execute(f"SELECT COUNT(*) FROM results{where}", params).fetchone()[0]
+        sql = f"SELECT * FROM results{where} ORDER BY processed_at DESC"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        rows = []
+        for row in conn.execute(sql, params):
+            record = dict(row)
+            record["escalate"] = bool(record["escalate"])
+            record["timings"] = json.loads(record["timings"] or "{}")
+            record["state"] = json.loads(record["state"])
+            rows.append(record)
+        return rows
+    finally:
+        conn.close()
+
+
+def format_rows(rows: list[dict]) -> str:
+    lines = [
+        f"{'Processed at':<20}{'Topic':<17}{'Urgency':<9}{'Decision':<10}{'Secs':>7}  Email",
+        "-" * 100,
+    ]
+    for row in rows:
+        state = row["state"]
+        email = " ".join((state.get("original_email") or state.get("email_content") or "").split())
+        when = datetime.fromtimestamp(row["processed_at"]).strftime("%Y-%m-%d %H:%M:%S")
+        seconds = f"{row['total_seconds']:.1f}" if row["total_seconds"] is not None else "N/A"
+        lines.append(
+            f"{when:<20}{row['topic'] or '':<17}{row['urgency'] or '':<9}"
+            f"{'ESCALATE' if row['escalate'] else 'AUTO':<10}{seconds:>7}  {email[:40]}"
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Query processed email results")
+    parser.add_argument("db", help="Results database (created by main.py --store)")
+    parser.add_argument("--topic", help="e.g. Billing, 'Technical Issue'")
+    parser.add_argument("--urgency", help="Low, Medium or High")
+    parser.add_argument("--escalate", choices=["yes", "no"], help="Only escalated / auto-replied emails")
+    parser.add_argument("--since", help="ISO date/time or age (30m, 24h, 7d)")
+    parser.add_argument("--until", help="ISO date/time or age (30m, 24h, 7d)")
+    parser.add_argument("--limit", type=int, default=50, help="Max rows to list")
+    parser.add_argument("--count", action="store_true", help="Print only the number of matching rows")
+    parser.add_argument("--json", action="store_true", help="Output rows as JSON lines")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"Error: {args.db} does not exist.", file=sys.stderr)
+        sys.exit(1)
+
+    filters = {
+        "topic": args.topic,
+        "urgency": args.urgency,
+        "escalate": None if args.escalate is None else args.escalate == "yes",
+        "since": parse_time(args.since) if args.since else None,
+        "until": parse_time(args.until) if args.until else None,
+    }
+    if args.count:
+        print(query(args.db, count=True, **filters))
+        return
+
+    rows = query(args.db, limit=args.limit, **filters)
+    if args.json:
+        for row in rows:
+            print(json.dumps(row, ensure_ascii=False))
+    else:
+        print(format_rows(rows))
+
+
+if __name__ == "__main__":
+    main()
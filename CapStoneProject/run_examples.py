@@ -1,10 +1,21 @@
 #!/usr/bin/env python3
 """
 Run all 5 example scenarios from the capstone requirements.
+
+Usage:
+  python run_examples.py
+  python run_examples.py --record cassettes/examples.jsonl.gz   # save LLM calls
+  python run_examples.py --replay cassettes/examples.jsonl.gz   # no model needed
+  python run_examples.py --replay cassettes/examples.jsonl.gz --timed
 """
 
+import argparse
+
 from main import format_output
-from src.agent import get_agent
+from src import cassette
+from src.agent import LLM, initial_state, invoke_timed, warm_up
+from src.prefill_meter import PrefillMeter
+from src.results_store import ResultsStore
 
 EXAMPLES = [
 #    "How do I reset my password?",
@@ -24,20 +35,46 @@ LABELS = [
 
 
 def main():
-    agent = get_agent()
-    for label, email in zip(LABELS, EXAMPLES):
-        print(f"\n{'='*60}\n{label}\nEmail: {email}\n")
-        initial = {
-            "email_content": email,
-            "urgency": "",
-            "topic": "",
-            "kb_context": "",
-            "response_draft": "",
-            "escalate": False,
-            "follow_up": "",
-        }
-        result = agent.invoke(initial)
-        print(format_output(result))
+    parser = argparse.ArgumentParser(description="Run the example support emails")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--record", metavar="CASSETTE", help="Record every LLM call to a cassette file")
+    group.add_argument("--replay", metavar="CASSETTE", help="Answer LLM calls from a recorded cassette")
+    parser.add_argument("--timed", action="store_true", help="With --replay, reproduce recorded latencies")
+    parser.add_argument("--warmup", action="store_true", help="Load the model and prime prompt prefixes first")
+    parser.add_argument(
+        "--measure-prefill",
+        action="store_true",
+        help="Report prompt tokens vs. prefill tokens Ollama actually evaluated, per node",
+    )
+    parser.add_argument("--store", metavar="DB", help="Save results to a SQLite results store")
+    args = parser.parse_args()
+
+    if args.record:
+        cassette.configure(args.record, "record")
+    elif args.replay:
+        cassette.configure(args.replay, "replay-timed" if args.timed else "replay")
+
+    if args.warmup:
+        warm_up()
+
+    meter = PrefillMeter() if args.measure_prefill else None
+    config = {"callbacks": [meter]} if meter else None
+    store = ResultsStore(args.store) if args.store else None
+    try:
+        for label, email in zip(LABELS, EXAMPLES):
+            print(f"\n{'='*60}\n{label}\nEmail: {email}\n")
+            result, timings = invoke_timed(initial_state(email), config=config)
+            print(format_output(result))
+            print(f"Processed in {timings['total']:.2f}s")
+            if store:
+                store.add(result, timings, LLM.model)
+    finally:
+        # Commit rows already queued even if an example fails
+        if store:
+            store.close()
+
+    if meter:
+        print("\n" + meter.report())
 
 
 if __name__ == "__main__":
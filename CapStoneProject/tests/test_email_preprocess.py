@@ -0,0 +1,68 @@
+"""Behaviour tests for email preprocessing (run from the project root: pytest src/tests)."""
+
+import pytest
+
+from src.email_preprocess import clean_email
+
+
+@pytest.mark.parametrize(
+    "email",
+    [
+        "Hi,\nNotice: I was charged twice for my subscription this month.\nPlease refund.",
+        "Hello\n\nDisclaimer: I'm not technical, but the API integration fails with 504 errors.",
+        "Hi team,\nBest\nregards aside, the API returns 504 errors on every retry.",
+        "Export to PDF is broken.\nBR\nCSV export too.",
+        "Steps:\n--\nclick export\n--\nit crashes",
+        "Our invoice says:\n______________\nPro plan x2   $80\nTotal due   $80\nWe only have one seat, please correct it.",
+    ],
+)
+def test_keeps_message_that_looks_like_boilerplate(email):
+    assert clean_email(email) == email
+
+
+def test_keeps_postscript_after_sign_off():
+    email = "The app crashes on PDF export.\n\nThanks!\nP.S. It also happens on CSV export."
+    assert "P.S. It also happens on CSV export." in clean_email(email)
+
+
+def test_keeps_sentences_after_sign_off():
+    email = "Export fails.\n\nThanks,\nAlso, the dashboard has not loaded since Monday."
+    assert "dashboard has not loaded" in clean_email(email)
+
+
+def test_strips_sign_off_and_signature_block():
+    email = "The app crashes on export.\n\nKind regards,\nJane Doe\nSupport Lead, Acme\n+1 555 0100"
+    assert clean_email(email) == "The app crashes on export."
+
+
+def test_strips_trailing_disclaimer():
+    email = (
+        "I was charged twice this month.\n\n"
+        "CONFIDENTIALITY NOTICE: This e-mail and any attachments are confidential "
+        "and intended solely for the addressee."
+    )
+    assert clean_email(email) == "I was charged twice this month."
+
+
+def test_keeps_disclaimer_phrase_early_in_long_message():
+    body = "\n".join(f"Step {i}: the export still fails." for i in range(20))
+    email = "This message is confidential, please do not share the logs below.\n" + body
+    assert clean_email(email) == email
+
+
+def test_strips_quoted_reply_and_mobile_signature():
+    email = (
+        "Still broken after the update.\n\nSent from my iPhone\n\n"
+        "On Mon, Oct 12, 2026 at 9:00 AM Support <help@example.com> wrote:\n> Please try again."
+    )
+    assert clean_email(email) == "Still broken after the update."
+
+
+def test_strips_signature_delimiter_block():
+    email = "The app crashes on export.\n\n-- \nJane Doe\nAcme Inc."
+    assert clean_email(email) == "The app crashes on export."
+
+
+def test_falls_back_to_original_when_nothing_left():
+    email = "> forwarded text only"
+    assert clean_email(email) == email
@@ -0,0 +1,12 @@
+"""Behaviour tests for the keyword matcher (run from the project root: pytest src/tests)."""
+
+from src.keyword_rules import KeywordMatcher
+
+
+def test_match_batch_keeps_one_result_per_text_with_nul():
+    matcher = KeywordMatcher(["refund", "api"])
+    assert matcher.match_batch(["log\x00refund please", "api down", ""]) == [{"refund"}, {"api"}, set()]
+
+
+def test_match_batch_of_no_texts_is_empty():
+    assert KeywordMatcher(["refund"]).match_batch([]) == []
@@ -0,0 +1,20 @@
+"""Behaviour tests for the results store (run from the project root: pytest src/tests)."""
+
+import threading
+
+from src.results_store import ResultsStore, query
+
+
+def test_bad_row_in_final_batch_is_dropped_and_close_returns(tmp_path):
+    path = tmp_path / "results.db"
+    store = ResultsStore(path, flush_interval=60)
+    store.add({"topic": "Billing"}, timings={"total": 2**70})  # too large for SQLite
+    store.add({"topic": "Bug"}, timings={"total": 1.5})
+
+    closer = threading.Thread(target=store.close, daemon=True)
+    closer.start()
+    closer.join(timeout=5)
+
+    assert not closer.is_alive()
+    assert store.failed_rows == 1
+    assert [row["topic"] for row in query(path)] == ["Bug"]
@@ -6,6 +6,10 @@ Uses system prompt (Senior HR Compliance Auditor) + human prompt with draft poli
 
 from langchain_ollama import ChatOllama
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from CapStoneProject.cassette import use_cassette
+from CapStoneProject.context_budget import ContextBudget
 
 SYSTEM_PROMPT = """You are a Senior HR Compliance Auditor. Your role is to review draft policy documents for legal safety, clarity, and completeness.
 
@@ -52,19 +56,42 @@ DEFAULT_DRAFT_POLICY = """Remote Work and Equipment Policy: Global Connectivity
 4. Behavior & Productivity We trust our employees to be productive. You don't need to log your hours specifically as long as your work gets done. However, if we notice you aren't responding to Slack messages quickly, we may revoke your remote work privileges at any time without much notice.
 5. Safety Please make sure your home office is safe and ergonomic. The company is not responsible for any accidents that happen while you are working in your living room or a coffee shop."""
 
-llm = ChatOllama(model="gemma3:1b", temperature=0.2)
+DEFAULT_REGION = "US/California"
 
-prompt = ChatPromptTemplate.from_messages([
+PROMPT = ChatPromptTemplate.from_messages([
     ("system", SYSTEM_PROMPT),
     ("human", HUMAN_PROMPT),
 ])
 
-chain = prompt | llm
+# Context window and reply cap; longer policies are cut at the end to fit what is left
+NUM_CTX = 4096
+NUM_PREDICT = 1024
+BUDGET = ContextBudget("hr_policy_audit", NUM_CTX - NUM_PREDICT)
+
+_chain: Runnable | None = None
+
+
+def get_chain() -> Runnable:
+    """Get the prompt | model chain, built once per process."""
+    global _chain
+    if _chain is None:
+        llm = use_cassette(
+            ChatOllama(model="gemma3:1b", temperature=0.2, num_ctx=NUM_CTX, num_predict=NUM_PREDICT)
+        )
+        _chain = PROMPT | llm
+    return _chain
+
+
+def audit_policy(draft_policy: str, region: str = DEFAULT_REGION, config: RunnableConfig | None = None) -> str:
+    """Audit a draft HR policy for the given region; returns the model's JSON text."""
+    draft_policy = BUDGET.fit_text(PROMPT, "draft_policy", draft_policy, region=region)
+    response = get_chain().invoke({"draft_policy": draft_policy, "region": region}, config=config)
+    return response.content
+
+
+def main() -> None:
+    print(audit_policy(DEFAULT_DRAFT_POLICY))
 
-inputs = {
-    "draft_policy": DEFAULT_DRAFT_POLICY,
-    "region": "US/California",
-}
 
-response = chain.invoke(inputs)
-print(response.content)
+if __name__ == "__main__":
+    main()
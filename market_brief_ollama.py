@@ -6,6 +6,9 @@ Uses system prompt (Senior Market Intelligence Analyst) + human prompt with sour
 
 from langchain_ollama import ChatOllama
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from CapStoneProject.cassette import use_cassette
 
 SYSTEM_PROMPT = """You are a Senior Market Intelligence Analyst. Your role is to synthesize complex, multi-source data into a high-level strategic brief.
 
@@ -46,21 +49,39 @@ HUMAN_PROMPT = """Please generate a Market Analysis Brief based on the following
 Deliver the JSON object first, followed by a horizontal rule, and then the Narrative Summary."""
 
 
-llm = ChatOllama(model="gemma3:1b", temperature=0.3)
-
-prompt = ChatPromptTemplate.from_messages([
-    ("system", SYSTEM_PROMPT),
-    ("human", HUMAN_PROMPT),
-])
-
-chain = prompt | llm
-
 # Replace with your actual article URLs, report links, or pasted text excerpts
-sources = {
+DEFAULT_SOURCES = {
     "source_1": "https://www2.deloitte.com/us/en/pages/technology/articles/2025-technology-industry-outlook.html",
     "source_2": "https://www.wsj.com/articles/us-defense-department-ai-llm-federal-budget-11675418000",
     "source_3": "https://www.theregister.com/2026/02/03/ai_llm_us_federal_budget/",
 }
 
-response = chain.invoke(sources)
-print(response.content)
+_chain: Runnable | None = None
+
+
+def get_chain() -> Runnable:
+    """Get the prompt | model chain, built once per process."""
+    global _chain
+    if _chain is None:
+        llm = use_cassette(ChatOllama(model="gemma3:1b", temperature=0.3))
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", SYSTEM_PROMPT),
+            ("human", HUMAN_PROMPT),
+        ])
+        _chain = prompt | llm
+    return _chain
+
+
+def generate_brief(source_1: str, source_2: str, source_3: str, config: RunnableConfig | None = None) -> str:
+    """Generate a market analysis brief (JSON + narrative) from three sources."""
+    inputs = {"source_1": source_1, "source_2": source_2, "source_3": source_3}
+    response = get_chain().invoke(inputs, config=config)
+    return response.content
+
+
+def main() -> None:
+    print(generate_brief(**DEFAULT_SOURCES))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,9 @@ Uses a system prompt (Corporate Communications Assistant) + user prompt.
 
 from langchain_ollama import ChatOllama
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from CapStoneProject.cassette import use_cassette
 
 SYSTEM_PROMPT = """You are an expert Corporate Communications Assistant. Your goal is to draft professional, high-clarity project update emails.
 
@@ -30,18 +33,33 @@ USER_PROMPT = """Please draft a professional project status email based on the f
 
 Ensure the email invites the client to provide feedback and maintains a polished, executive-level feel."""
 
-llm = ChatOllama(model="gemma3:1b", temperature=0.3)
+_chain: Runnable | None = None
+
+
+def get_chain() -> Runnable:
+    """Get the prompt | model chain, built once per process."""
+    global _chain
+    if _chain is None:
+        llm = use_cassette(ChatOllama(model="gemma3:1b", temperature=0.3))
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", SYSTEM_PROMPT),
+            ("human", USER_PROMPT),
+        ])
+        _chain = prompt | llm
+    return _chain
+
 
-prompt = ChatPromptTemplate.from_messages([
-    ("system", SYSTEM_PROMPT),
-    ("human", USER_PROMPT),
-])
+def draft_status_email(project_name: str, client_name: str, config: RunnableConfig | None = None) -> str:
+    """Draft a project status email for the given project and client."""
+    response = get_chain().invoke({"project_name": project_name, "client_name": client_name}, config=config)
+    return response.content
 
-chain = prompt | llm
 
-project_name = input("Project name: ").strip()
-client_name = input("Client name: ").strip()
+def main() -> None:
+    project_name = input("Project name: ").strip()
+    client_name = input("Client name: ").strip()
+    print(draft_status_email(project_name, client_name))
 
-response = chain.invoke({"project_name": project_name, "client_name": client_name})
 
-print(response.content)
+if __name__ == "__main__":
+    main()
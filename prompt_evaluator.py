@@ -6,14 +6,39 @@ Usage:
   python prompt_evaluator.py "Your prompt here"
   python prompt_evaluator.py   # then type prompt, Ctrl-D / Ctrl-Z to finish
 
+Corpus mode (one JSON object per line: {"id": "...", "prompt": "..."}):
+  python prompt_evaluator.py --corpus prompts.jsonl --out results.csv
+  python prompt_evaluator.py --corpus prompts.jsonl --out results.jsonl --concurrency 8
+
+Self-consistency mode (average up to N samples, stop early when they agree):
+  python prompt_evaluator.py "Your prompt here" --samples 8
+
 Requires: Ollama running locally, pip install langchain-core langchain-ollama pydantic
 """
 
+import argparse
+import csv
+import json
+import statistics
 import sys
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Iterator
 
+from langchain_core.exceptions import OutputParserException
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable
 from langchain_ollama import ChatOllama
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
+
+from CapStoneProject.cassette import use_cassette
+
+MODEL = "gemma3:1b"
+
+# Errors raised when the model's reply does not fit PromptEvaluationResult.
+# Only these are retried; connection errors etc. surface immediately.
+PARSE_ERRORS = (OutputParserException, ValidationError)
 
 
 # --- Output schema ---
@@ -31,6 +56,9 @@ class PromptEvaluationResult(BaseModel):
     improvement_suggestions: list[str]
 
 
+CRITERIA = list(CriterionScores.model_fields)
+
+
 # --- Prompts ---
 SYSTEM_PROMPT = """You are an expert prompt engineer. Evaluate user prompts for AI systems.
 
@@ -50,18 +78,30 @@ USER_TEMPLATE = """Evaluate this prompt:
 ---"""
 
 
-def evaluate(prompt: str, temperature: float = 0.2) -> dict:
-    """Run evaluation (single chain, default model, no fallback)."""
-    llm = ChatOllama(model="gemma3:1b", temperature=temperature)
+def build_chain(temperature: float = 0.2) -> Runnable:
+    """Build the evaluation chain (prompt | structured model) once for reuse."""
+    llm = use_cassette(ChatOllama(model=MODEL, temperature=temperature))
     structured_llm = llm.with_structured_output(PromptEvaluationResult)
     chat_prompt = ChatPromptTemplate.from_messages([
         ("system", SYSTEM_PROMPT),
         ("human", USER_TEMPLATE),
     ])
-    chain = chat_prompt | structured_llm
+    return chat_prompt | structured_llm
+
+
+def _invoke(chain: Runnable, prompt: str, max_retries: int) -> PromptEvaluationResult:
+    """Invoke the chain, retrying only when the structured output fails to parse."""
+    attempt = 0
+    while True:
+        try:
+            return chain.invoke({"prompt": prompt})
+        except PARSE_ERRORS:
+            if attempt >= max_retries:
+                raise
+            attempt += 1
 
-    result: PromptEvaluationResult = chain.invoke({"prompt": prompt})
 
+def _to_dict(result: PromptEvaluationResult) -> dict:
     s = result.criterion_scores
     final = (s.clarity + s.specificity_details + s.context + s.output_format_constraints + s.persona_defined) / 5.0
 
@@ -79,14 +119,312 @@ def evaluate(prompt: str, temperature: float = 0.2) -> dict:
     }
 
 
+def evaluate(
+    prompt: str,
+    temperature: float = 0.2,
+    chain: Runnable | None = None,
+    max_retries: int = 0,
+) -> dict:
+    """Run evaluation (single chain, default model, no fallback).
+
+    Pass a chain from build_chain() to reuse it across calls; ``temperature``
+    is ignored in that case.
+    """
+    if chain is None:
+        chain = build_chain(temperature)
+    return _to_dict(_invoke(chain, prompt, max_retries))
+
+
+# --- Adaptive multi-sample scoring ---
+
+SAMPLING_TEMPERATURE = 0.7
+
+# Two-sided 95% Student-t critical values by degrees of freedom (1-30).
+_T_95 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]
+
+
+def _confidence_interval(values: list[float]) -> list[float]:
+    """95% confidence interval for the mean of ``values``, clipped to 0-10."""
+    mean = statistics.fmean(values)
+    if len(values) < 2:
+        return [round(mean, 1), round(mean, 1)]
+    df = len(values) - 1
+    t = _T_95[df - 1] if df <= len(_T_95) else 1.96
+    half = t * statistics.stdev(values) / len(values) ** 0.5
+    return [round(max(0.0, mean - half), 1), round(min(10.0, mean + half), 1)]
+
+
+def evaluate_adaptive(
+    prompt: str,
+    chain: Runnable | None = None,
+    min_samples: int = 2,
+    max_samples: int = 8,
+    round_size: int = 2,
+    variance_threshold: float = 0.5,
+) -> dict:
+    """Self-consistency evaluation: average several samples, stopping early.
+
+    ``min_samples`` samples run concurrently first; further rounds of
+    ``round_size`` run only while some criterion's sample variance exceeds
+    ``variance_threshold``, up to ``max_samples`` calls in total. Samples
+    whose structured output fails to parse count against the budget and are
+    dropped. The result has the same shape as evaluate(), with averaged
+    scores plus 95% confidence intervals and the number of samples used.
+    """
+    if chain is None:
+        chain = build_chain(SAMPLING_TEMPERATURE)
+
+    samples: list[dict] = []
+    calls = 0
+    last_error: Exception | None = None
+    converged = False
+    while calls < max_samples:
+        n = min(max(min_samples, 1) if calls == 0 else round_size, max_samples - calls)
+        outputs = chain.batch([{"prompt": prompt}] * n, return_exceptions=True)
+        calls += n
+        for output in outputs:
+            if isinstance(output, PARSE_ERRORS):
+                last_error = output
+            elif isinstance(output, Exception):
+                raise output
+            else:
+                samples.append(_to_dict(output))
+
+        if len(samples) >= max(min_samples, 2):
+            converged = all(
+                statistics.variance([s["criterion_scores"][name] for s in samples]) <= variance_threshold
+                for name in CRITERIA
+            )
+            if converged:
+                break
+
+    if not samples:
+        raise last_error
+
+    criterion_scores = {}
+    intervals = {}
+    for name in CRITERIA:
+        values = [s["criterion_scores"][name] for s in samples]
+        criterion_scores[name] = round(statistics.fmean(values), 1)
+        intervals[name] = _confidence_interval(values)
+    finals = [s["final_score"] for s in samples]
+    final = statistics.fmean(finals)
+    # Explanation and suggestions come from the sample closest to the consensus.
+    representative = min(samples, key=lambda s: abs(s["final_score"] - final))
+
+    return {
+        "final_score": round(final, 1),
+        "final_score_ci": _confidence_interval(finals),
+        "criterion_scores": criterion_scores,
+        "confidence_intervals": intervals,
+        "samples": len(samples),
+        "calls": calls,
+        "converged": converged,
+        "explanation": representative["explanation"],
+        "improvement_suggestions": representative["improvement_suggestions"],
+    }
+
+
+# --- Corpus mode ---
+
+
+def _parse_corpus_line(line: str, lineno: int) -> tuple[str, str]:
+    record = json.loads(line)
+    if isinstance(record, str):
+        return str(lineno), record
+    if not isinstance(record, dict):
+        raise ValueError("expected a JSON object or string")
+    if not isinstance(record.get("prompt"), str):
+        raise ValueError('missing string "prompt"')
+    return str(record.get("id", lineno)), record["prompt"]
+
+
+def load_corpus(path: str | Path) -> Iterator[tuple[str, str | None, str | None]]:
+    """Yield (id, prompt, error) triples from a JSONL file.
+
+    Each line is either {"id": ..., "prompt": ...} or a bare JSON string.
+    Lines without an id use their line number. A line that cannot be read
+    is yielded with ``None`` as prompt and the error, so it is recorded as a
+    failed row instead of ending the run.
+    """
+    with open(path, "rb") as f:
+        for lineno, raw in enumerate(f, 1):
+            try:
+                line = raw.decode("utf-8").strip()
+                if not line:
+                    continue
+                item_id, prompt = _parse_corpus_line(line, lineno)
+            except (ValueError, UnicodeDecodeError) as e:  # JSONDecodeError is a ValueError
+                yield str(lineno), None, f"Bad input on line {lineno}: {type(e).__name__}: {e}"
+                continue
+            yield item_id, prompt, None
+
+
+class ResultWriter:
+    """Stream corpus results to CSV or JSONL, chosen by the output file suffix."""
+
+    CSV_FIELDS = ["id", "final_score", *CRITERIA, "samples", "explanation", "improvement_suggestions", "error"]
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._file = open(self.path, "w", encoding="utf-8", newline="")
+        self._csv = None
+        if self.path.suffix.lower() == ".csv":
+            self._csv = csv.DictWriter(self._file, fieldnames=self.CSV_FIELDS)
+            self._csv.writeheader()
+
+    def write(self, row: dict) -> None:
+        if self._csv is None:
+            self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        else:
+            result = row.get("result") or {}
+            self._csv.writerow({
+                "id": row["id"],
+                "final_score": result.get("final_score", ""),
+                **result.get("criterion_scores", dict.fromkeys(CRITERIA, "")),
+                "samples": result.get("samples", 1 if result else ""),
+                "explanation": result.get("explanation", ""),
+                "improvement_suggestions": " | ".join(result.get("improvement_suggestions", [])),
+                "error": row.get("error", ""),
+            })
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "ResultWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class CorpusSummary:
+    """Running score distributions for a corpus evaluation."""
+
+    def __init__(self):
+        self.total = 0
+        self.failed = 0
+        self.final_scores: list[float] = []
+        self.scores: dict[str, list[float]] = {name: [] for name in CRITERIA}
+        self.histograms: dict[str, Counter] = {name: Counter() for name in CRITERIA}
+
+    def add(self, row: dict) -> None:
+        self.total += 1
+        result = row.get("result")
+        if result is None:
+            self.failed += 1
+            return
+        self.final_scores.append(result["final_score"])
+        for name, score in result["criterion_scores"].items():
+            self.scores[name].append(score)
+            # Averaged multi-sample scores are binned to the nearest integer.
+            self.histograms[name][round(score)] += 1
+
+    def as_dict(self) -> dict:
+        criteria = {}
+        for name, hist in self.histograms.items():
+            scores = self.scores[name]
+            criteria[name] = {
+                "mean": round(statistics.fmean(scores), 2) if scores else None,
+                "stdev": round(statistics.pstdev(scores), 2) if scores else None,
+                "median": statistics.median(scores) if scores else None,
+                "histogram": {score: hist[score] for score in range(11)},
+            }
+        return {
+            "total": self.total,
+            "failed": self.failed,
+            "final_score_mean": round(statistics.fmean(self.final_scores), 2) if self.final_scores else None,
+            "criteria": criteria,
+        }
+
+
+def _evaluate_item(
+    chain: Runnable, item_id: str, prompt: str, max_retries: int, samples: int, variance_threshold: float
+) -> dict:
+    try:
+        if samples > 1:
+            result = evaluate_adaptive(
+                prompt, chain=chain, max_samples=samples, variance_threshold=variance_threshold
+            )
+        else:
+            result = evaluate(prompt, chain=chain, max_retries=max_retries)
+        return {"id": item_id, "result": result}
+    except Exception as e:
+        return {"id": item_id, "result": None, "error": f"{type(e).__name__}: {e}"}
+
+
+def evaluate_corpus(
+    corpus_path: str | Path,
+    output_path: str | Path,
+    concurrency: int = 4,
+    max_retries: int = 2,
+    temperature: float = 0.2,
+    samples: int = 1,
+    variance_threshold: float = 0.5,
+) -> dict:
+    """Evaluate every prompt in a JSONL corpus with one shared chain.
+
+    At most ``concurrency`` requests run at once and at most twice that many
+    prompts are held in memory. Results are written as they complete, so
+    output order follows completion, not input order. Unreadable corpus
+    lines, and prompts that still fail after ``max_retries`` parse retries,
+    are recorded with their error and the run continues.
+
+    With ``samples`` > 1 each prompt is scored by evaluate_adaptive() with
+    that many calls at most, and each worker may have a small batch of
+    requests in flight at once. ``max_retries`` does not apply there:
+    unparseable samples are dropped rather than retried.
+    """
+    chain = build_chain(SAMPLING_TEMPERATURE if samples > 1 else temperature)
+    summary = CorpusSummary()
+
+    def collect(rows) -> None:
+        for row in rows:
+            writer.write(row)
+            summary.add(row)
+        print(f"\rEvaluated {summary.total} prompts ({summary.failed} failed)", end="", file=sys.stderr, flush=True)
+
+    with ResultWriter(output_path) as writer, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        pending = set()
+        for item_id, prompt, error in load_corpus(corpus_path):
+            if error is not None:
+                collect([{"id": item_id, "result": None, "error": error}])
+                continue
+            if len(pending) >= concurrency * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(f.result() for f in done)
+            pending.add(pool.submit(
+                _evaluate_item, chain, item_id, prompt, max_retries, samples, variance_threshold
+            ))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            collect(f.result() for f in done)
+    print(file=sys.stderr)
+
+    return summary.as_dict()
+
+
 def print_result(result: dict) -> None:
     print("\n" + "=" * 60)
     print("PROMPT QUALITY SCORE")
     print("=" * 60)
-    print(f"\nFinal Score: {result['final_score']}/10\n")
+    intervals = result.get("confidence_intervals", {})
+    final_ci = result.get("final_score_ci")
+    ci_text = f" (95% CI {final_ci[0]}-{final_ci[1]})" if final_ci else ""
+    print(f"\nFinal Score: {result['final_score']}/10{ci_text}\n")
+    if "samples" in result:
+        status = "converged" if result["converged"] else "sample budget exhausted"
+        print(f"Samples: {result['samples']} from {result['calls']} calls ({status})\n")
     print("Criterion Scores:")
     for name, score in result["criterion_scores"].items():
-        print(f"  • {name.replace('_', ' ').title()}: {score}/10")
+        ci = intervals.get(name)
+        ci_text = f"  (95% CI {ci[0]}-{ci[1]})" if ci else ""
+        print(f"  • {name.replace('_', ' ').title()}: {score}/10{ci_text}")
     print(f"\nExplanation:\n  {result['explanation']}")
     print("\nImprovement Suggestions:")
     for i, s in enumerate(result["improvement_suggestions"], 1):
@@ -94,9 +432,72 @@ def print_result(result: dict) -> None:
     print("=" * 60 + "\n")
 
 
+def print_summary(summary: dict) -> None:
+    print("\n" + "=" * 60)
+    print("CORPUS SUMMARY")
+    print("=" * 60)
+    print(f"\nPrompts: {summary['total']}  Failed: {summary['failed']}")
+    print(f"Mean Final Score: {summary['final_score_mean']}/10\n")
+    print("Score distribution (count per score 0-10):")
+    for name, stats in summary["criteria"].items():
+        counts = " ".join(f"{stats['histogram'][score]:>4}" for score in range(11))
+        print(f"  • {name.replace('_', ' ').title():<28} mean={stats['mean']} stdev={stats['stdev']}")
+        print(f"    {counts}")
+    print("=" * 60 + "\n")
+
+
 def main() -> None:
-    if len(sys.argv) > 1:
-        text = sys.argv[1]
+    parser = argparse.ArgumentParser(description="Evaluate prompt quality with a local Ollama model")
+    parser.add_argument("prompt", nargs="?", default=None, help="Prompt to evaluate (or omit to read stdin)")
+    parser.add_argument("--corpus", help="JSONL file of prompts to evaluate in bulk")
+    parser.add_argument("--out", help="Corpus results file (.csv or .jsonl)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent requests in corpus mode")
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=None,
+        help="Retries per prompt on structured-output parse failure (default 2); "
+        "not valid with --samples > 1, which drops unparseable samples instead",
+    )
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=1,
+        help="Max samples per prompt; >1 averages samples and stops early once scores agree",
+    )
+    parser.add_argument(
+        "--variance-threshold",
+        type=float,
+        default=0.5,
+        help="Stop sampling once every criterion's variance is at or below this",
+    )
+    args = parser.parse_args()
+    if args.samples > 1 and args.retries is not None:
+        parser.error("--retries has no effect with --samples > 1 (unparseable samples are dropped)")
+    retries = 2 if args.retries is None else args.retries
+
+    if args.corpus:
+        if not args.out:
+            parser.error("--corpus requires --out")
+        if not Path(args.corpus).exists():
+            parser.error(f"{args.corpus} does not exist")
+        try:
+            summary = evaluate_corpus(
+                args.corpus,
+                args.out,
+                args.concurrency,
+                retries,
+                samples=args.samples,
+                variance_threshold=args.variance_threshold,
+            )
+        except Exception as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        print_summary(summary)
+        return
+
+    if args.prompt:
+        text = args.prompt
     else:
         print("Enter prompt (Ctrl-D / Ctrl-Z to finish):", flush=True)
         try:
@@ -110,7 +511,10 @@ def main() -> None:
         sys.exit(1)
 
     try:
-        result = evaluate(text)
+        if args.samples > 1:
+            result = evaluate_adaptive(text, max_samples=args.samples, variance_threshold=args.variance_threshold)
+        else:
+            result = evaluate(text, max_retries=retries)
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Run any of the standalone prompt scripts over many inputs with a worker pool.
+
+Inputs are either a JSONL file (one JSON object of task arguments per line,
+optional "id") or a directory of files: *.json files hold one object of
+arguments, any other file is read as text into the task's main text field.
+Hidden files are ignored; unreadable inputs are recorded as failed jobs.
+
+Usage:
+  python prompt_jobs.py list
+  python prompt_jobs.py project_email jobs.jsonl --out results.jsonl
+  python prompt_jobs.py transcript transcripts/ --out results.jsonl --workers 4
+
+Requires: Ollama running locally, pip install langchain-core langchain-ollama
+"""
+
+import argparse
+import importlib
+import json
+import statistics
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+
+@dataclass(frozen=True)
+class Task:
+    """A prompt script exposed as a job: its task function and how to map inputs.
+
+    Job inputs are passed to the function as keyword arguments, so optional
+    arguments (e.g. the audit region) take the script's own defaults.
+    """
+
+    module: str
+    function: str
+    description: str
+    text_field: str | None = None  # argument filled from plain-text input files
+    name_field: str | None = None  # argument filled with the input file's name
+
+
+TASKS = {
+    "project_email": Task(
+        "project_email_draft",
+        "draft_status_email",
+        "Project status email (project_name, client_name)",
+    ),
+    "transcript": Task(
+        "transcript_formatter",
+        "format_transcript",
+        "Meeting transcript → decisions and action items (transcript)",
+        text_field="transcript",
+    ),
+    "hr_policy_audit": Task(
+        "hr_policy_audit_ollama",
+        "audit_policy",
+        "HR policy compliance audit (draft_policy, optional region)",
+        text_field="draft_policy",
+    ),
+    "market_brief": Task(
+        "market_brief_ollama",
+        "generate_brief",
+        "Market analysis brief (source_1, source_2, source_3)",
+    ),
+    "quarterly_report": Task(
+        "quarterly_report_summary_ollama",
+        "summarize_report",
+        "Quarterly report executive summary (report_url, optional report_content)",
+        text_field="report_content",
+        name_field="report_url",
+    ),
+}
+
+
+def _read_input_file(file: Path, task: Task) -> dict:
+    if file.suffix.lower() == ".json":
+        inputs = json.loads(file.read_text(encoding="utf-8"))
+    elif task.text_field:
+        inputs = {task.text_field: file.read_text(encoding="utf-8")}
+        if task.name_field:
+            inputs[task.name_field] = file.name
+    else:
+        raise ValueError("task needs JSON inputs")
+    if not isinstance(inputs, dict):
+        raise ValueError("expected a JSON object of task arguments")
+    return inputs
+
+
+def load_jobs(path: str | Path, task: Task) -> Iterator[tuple[str, dict | None, str | None]]:
+    """Yield (job id, task arguments, error) from a JSONL file or a directory of inputs.
+
+    An input that cannot be read or parsed is yielded with ``None`` arguments
+    and the error, so it is recorded as a failed job instead of ending the run.
+    Hidden files (e.g. .DS_Store) are skipped.
+    """
+    path = Path(path)
+    if path.is_dir():
+        for file in sorted(p for p in path.iterdir() if p.is_file() and not p.name.startswith(".")):
+            try:
+                yield file.stem, _read_input_file(file, task), None
+            except (ValueError, UnicodeDecodeError) as e:  # JSONDecodeError is a ValueError
+                yield file.stem, None, f"Bad input {file.name}: {type(e).__name__}: {e}"
+        return
+
+    with open(path, "rb") as f:
+        for lineno, raw in enumerate(f, 1):
+            try:
+                line = raw.decode("utf-8").strip()
+                if not line:
+                    continue
+                inputs = json.loads(line)
+                if not isinstance(inputs, dict):
+                    raise ValueError("expected a JSON object of task arguments")
+            except (ValueError, UnicodeDecodeError) as e:
+                yield str(lineno), None, f"Bad input on line {lineno}: {type(e).__name__}: {e}"
+                continue
+            yield str(inputs.pop("id", lineno)), inputs, None
+
+
+class _UsageCollector(BaseCallbackHandler):
+    """Sum token usage over the LLM calls of one job."""
+
+    def __init__(self):
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                self.input_tokens += usage.get("input_tokens") or 0
+                self.output_tokens += usage.get("output_tokens") or 0
+
+
+def _failed_row(job_id: str, error: str, seconds: float = 0.0) -> dict:
+    return {"id": job_id, "output": None, "error": error, "seconds": round(seconds, 3)}
+
+
+def _run_job(function, job_id: str, inputs: dict) -> dict:
+    usage = _UsageCollector()
+    start = time.perf_counter()
+    try:
+        output = function(**inputs, config={"callbacks": [usage]})
+    except Exception as e:
+        return _failed_row(job_id, f"{type(e).__name__}: {e}", time.perf_counter() - start)
+    return {
+        "id": job_id,
+        "output": output,
+        "seconds": round(time.perf_counter() - start, 3),
+        "input_tokens": usage.input_tokens,
+        "output_tokens": usage.output_tokens,
+    }
+
+
+class JobStats:
+    """Running timing and token totals for a batch of jobs."""
+
+    def __init__(self):
+        self.done = 0
+        self.failed = 0
+        self.seconds: list[float] = []
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def add(self, row: dict) -> None:
+        self.done += 1
+        if row.get("error"):
+            self.failed += 1
+            return
+        self.seconds.append(row["seconds"])
+        self.input_tokens += row.get("input_tokens") or 0
+        self.output_tokens += row.get("output_tokens") or 0
+
+    def as_dict(self, wall_seconds: float) -> dict:
+        latencies = sorted(self.seconds)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None
+        return {
+            "jobs": self.done,
+            "failed": self.failed,
+            "wall_seconds": round(wall_seconds, 2),
+            "jobs_per_minute": round(self.done / wall_seconds * 60, 1) if wall_seconds else None,
+            "latency_mean": round(statistics.fmean(latencies), 2) if latencies else None,
+            "latency_p50": round(statistics.median(latencies), 2) if latencies else None,
+            "latency_p95": p95,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "output_tokens_per_second": round(self.output_tokens / wall_seconds, 1) if wall_seconds else None,
+        }
+
+
+def run_jobs(task_name: str, source: str | Path, output_path: str | Path, workers: int = 4) -> dict:
+    """Apply a task to every input in ``source``; results stream to a JSONL file.
+
+    Jobs call the script's task function, whose chain is built once and
+    shared by all workers. Rows are written in completion order; jobs whose
+    input is unreadable or whose call fails are recorded with their error.
+    """
+    task = TASKS[task_name]
+    function = getattr(importlib.import_module(task.module), task.function)
+    stats = JobStats()
+    start = time.perf_counter()
+
+    def collect(rows) -> None:
+        for row in rows:
+            out.write(json.dumps(row, ensure_ascii=False) + "\n")
+            stats.add(row)
+        out.flush()
+        elapsed = time.perf_counter() - start
+        print(
+            f"\r[{task_name}] {stats.done} done, {stats.failed} failed, {elapsed:.0f}s elapsed",
+            end="",
+            file=sys.stderr,
+            flush=True,
+        )
+
+    with open(output_path, "w", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for job_id, inputs, error in load_jobs(source, task):
+            if error is not None:
+                collect([_failed_row(job_id, error)])
+                continue
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(f.result() for f in done)
+            pending.add(pool.submit(_run_job, function, job_id, inputs))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            collect(f.result() for f in done)
+    print(file=sys.stderr)
+
+    return stats.as_dict(time.perf_counter() - start)
+
+
+def print_stats(stats: dict) -> None:
+    print("\n" + "=" * 50)
+    print("JOB RUN SUMMARY")
+    print("=" * 50)
+    for name, value in stats.items():
+        print(f"{name.replace('_', ' ').title():<26} {value if value is not None else 'N/A'}")
+    print("=" * 50)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a prompt task over a directory or JSONL of inputs")
+    parser.add_argument("task", choices=[*TASKS, "list"], help="Task to run, or 'list' to show tasks")
+    parser.add_argument("source", nargs="?", help="Input directory or JSONL file")
+    parser.add_argument("--out", default="results.jsonl", help="Output JSONL file")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent jobs")
+    args = parser.parse_args()
+
+    if args.task == "list":
+        for name, task in TASKS.items():
+            print(f"  {name:<18} {task.description}")
+        return
+    if not args.source:
+        parser.error("source is required")
+    if not Path(args.source).exists():
+        parser.error(f"{args.source} does not exist")
+
+    try:
+        stats = run_jobs(args.task, args.source, args.out, args.workers)
+    except ImportError:
+        print(
+            "Error: Install dependencies first:\n"
+            "  pip install langchain-core langchain-ollama",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    print_stats(stats)
+
+
+if __name__ == "__main__":
+    main()
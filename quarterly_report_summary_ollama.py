@@ -11,6 +11,10 @@ from urllib.error import URLError
 
 from langchain_ollama import ChatOllama
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from CapStoneProject.cassette import use_cassette
+from CapStoneProject.context_budget import ContextBudget
 
 
 class _TextExtractor(HTMLParser):
@@ -26,7 +30,7 @@ class _TextExtractor(HTMLParser):
 
 
 def fetch_url_content(url: str, max_chars: int = 80_000) -> str:
-    """Fetch URL and return plain text (strip HTML). Truncate to max_chars for context limits."""
+    """Fetch URL and return plain text (strip HTML). Truncate to max_chars to bound memory."""
     req = Request(url, headers={"User-Agent": "Mozilla/5.0 (compatible; summary-bot/1.0)"})
     with urlopen(req, timeout=30) as resp:
         raw = resp.read().decode(errors="replace")
@@ -61,23 +65,56 @@ HUMAN_PROMPT = """Please analyze the attached Quarterly Performance Report and p
 
 **Constraint:** Ensure all metrics and risks are cited/sourced from the text provided. If the text does not contain enough data for a full table, provide only the confirmed data points."""
 
-llm = ChatOllama(model="gemma3:1b", temperature=0.2)
+DEFAULT_REPORT_URL = "https://www.microsoft.com/en-us/investor/earnings/fy-2025-q4/press-release-webcast"
 
-prompt = ChatPromptTemplate.from_messages([
+PROMPT = ChatPromptTemplate.from_messages([
     ("system", SYSTEM_PROMPT),
     ("human", HUMAN_PROMPT),
 ])
 
-chain = prompt | llm
-
-report_url = "https://www.microsoft.com/en-us/investor/earnings/fy-2025-q4/press-release-webcast"
-
-print("Fetching report content...")
-try:
-    report_content = fetch_url_content(report_url)
-except URLError as e:
-    report_content = f"[Could not fetch URL: {e}. Summarize based on the URL only if possible.]"
-    print(f"Warning: {e}")
-
-response = chain.invoke({"report_url": report_url, "report_content": report_content})
-print(response.content)
+# Reports are long, so use a larger context window than Ollama's default.
+# The prompt budget is what remains after the reply; content is cut at the end to fit.
+NUM_CTX = 8192
+NUM_PREDICT = 1024
+BUDGET = ContextBudget("quarterly_report", NUM_CTX - NUM_PREDICT)
+
+_chain: Runnable | None = None
+
+
+def get_chain() -> Runnable:
+    """Get the prompt | model chain, built once per process."""
+    global _chain
+    if _chain is None:
+        llm = use_cassette(
+            ChatOllama(model="gemma3:1b", temperature=0.2, num_ctx=NUM_CTX, num_predict=NUM_PREDICT)
+        )
+        _chain = PROMPT | llm
+    return _chain
+
+
+def summarize_report(
+    report_url: str, report_content: str | None = None, config: RunnableConfig | None = None
+) -> str:
+    """Summarize a quarterly report, fetching it from ``report_url`` if no content is given."""
+    if not report_content:
+        try:
+            report_content = fetch_url_content(report_url)
+        except URLError as e:
+            report_content = f"[Could not fetch URL: {e}. Summarize based on the URL only if possible.]"
+    report_content = BUDGET.fit_text(PROMPT, "report_content", report_content, report_url=report_url)
+    response = get_chain().invoke({"report_url": report_url, "report_content": report_content}, config=config)
+    return response.content
+
+
+def main() -> None:
+    print("Fetching report content...")
+    try:
+        report_content = fetch_url_content(DEFAULT_REPORT_URL)
+    except URLError as e:
+        report_content = f"[Could not fetch URL: {e}. Summarize based on the URL only if possible.]"
+        print(f"Warning: {e}")
+    print(summarize_report(DEFAULT_REPORT_URL, report_content))
+
+
+if __name__ == "__main__":
+    main()
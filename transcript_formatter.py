@@ -6,6 +6,10 @@ User picks one of two sample transcripts; the model extracts decisions and actio
 
 from langchain_ollama import ChatOllama
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from CapStoneProject.cassette import use_cassette
+from CapStoneProject.context_budget import ContextBudget
 
 SYSTEM_PROMPT = """You are a highly precise Project Management Analyst. Your task is to extract actionable intelligence from raw meeting transcripts.
 
@@ -46,23 +50,51 @@ SAMPLES = {
     "2": ("Server migration / vendor & post-mortem", SAMPLE_TRANSCRIPT_2),
 }
 
-llm = ChatOllama(model="gemma3:1b", temperature=0.2)
-prompt = ChatPromptTemplate.from_messages([
+PROMPT = ChatPromptTemplate.from_messages([
     ("system", SYSTEM_PROMPT),
     ("human", USER_PROMPT),
 ])
-chain = prompt | llm
 
-print("Select a transcript to format:")
-for key, (desc, _) in SAMPLES.items():
-    print(f"  {key}. {desc}")
-choice = input("Enter 1 or 2: ").strip()
+# Context window and reply cap; the prompt may use the rest, longer transcripts are cut at the end
+NUM_CTX = 4096
+NUM_PREDICT = 1024
+BUDGET = ContextBudget("transcript_formatter", NUM_CTX - NUM_PREDICT)
+
+_chain: Runnable | None = None
+
+
+def get_chain() -> Runnable:
+    """Get the prompt | model chain, built once per process."""
+    global _chain
+    if _chain is None:
+        llm = use_cassette(
+            ChatOllama(model="gemma3:1b", temperature=0.2, num_ctx=NUM_CTX, num_predict=NUM_PREDICT)
+        )
+        _chain = PROMPT | llm
+    return _chain
+
+
+def format_transcript(transcript: str, config: RunnableConfig | None = None) -> str:
+    """Extract decisions and action items from a raw meeting transcript."""
+    transcript = BUDGET.fit_text(PROMPT, "transcript", transcript)
+    response = get_chain().invoke({"transcript": transcript}, config=config)
+    return response.content
+
+
+def main() -> None:
+    print("Select a transcript to format:")
+    for key, (desc, _) in SAMPLES.items():
+        print(f"  {key}. {desc}")
+    choice = input("Enter 1 or 2: ").strip()
+
+    if choice not in SAMPLES:
+        print("Invalid choice. Using transcript 1.")
+        choice = "1"
+
+    _, transcript = SAMPLES[choice]
+    print("\nFormatting transcript...\n")
+    print(format_transcript(transcript))
 
-if choice not in SAMPLES:
-    print("Invalid choice. Using transcript 1.")
-    choice = "1"
 
-_, transcript = SAMPLES[choice]
-print("\nFormatting transcript...\n")
-response = chain.invoke({"transcript": transcript})
-print(response.content)
+if __name__ == "__main__":
+    main()